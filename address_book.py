@@ -1,68 +1,513 @@
 import datetime
+import itertools
+import os
+import threading
+from functools import partial
 from collections import UserList
 from serialize_pickle import Serializer
-from classes import Record
+from storage_sqlite import SQLiteStorage
+from classes import Record, Name, Phone, Email, Group, restore_record, record_version
+from indexes import FieldIndex, BirthdayIndex, PhoneSuffixIndex, EmailDomainIndex, NameTrie, NameTrigrams, AddressIndex, calendar_window
+import config
 
 class AddressBook(UserList):
     """A class to represent an address book."""
 
+    # Secondary indexes, each one is built from the contacts the first time it is used.
+    index_types = {
+        'phone': partial(FieldIndex, Phone),
+        'email': partial(FieldIndex, Email),
+        'group': partial(FieldIndex, Group),
+        'birthday': BirthdayIndex,
+        'name': NameTrie,
+        'fuzzy': NameTrigrams,
+        'address': AddressIndex,
+        'phone_suffix': PhoneSuffixIndex,
+        'email_domain': EmailDomainIndex,
+    }
+
     def __init__(self) -> None:
         """Initialize the AddressBook."""
-        self.path = r'address_book.pkl'
-        super().__init__(Serializer.deserialize_dict(self.path))
+        self.path = config.storage_path
+        self.journal_path = f'{self.path}.journal'
+        self.data = Serializer.deserialize_dict(self.path) # Fills `records` and `names`, see `data`.
+        self.indexes = dict() # Secondary indexes built so far, see `get_index`.
+        self.lock = threading.RLock() # Guards the contacts against the background flusher.
+        self.pending = list() # Changes that have not been written out yet.
+        self.replay_journal()
+
+        self.flusher_stop = threading.Event()
+        if config.flush_policy == 'interval':
+            threading.Thread(target=self.run_flusher, name='address-book-flusher', daemon=True).start()
+
+    @property
+    def data(self) -> list:
+        """
+        The contacts in insertion order, as a new list.
+
+        The contacts are stored in `records`, keyed by their identity so that a rename keeps
+        their place and a delete does not have to search for it, and indexed by name in `names`.
+        """
+        return list(self.records.values())
+
+    @data.setter
+    def data(self, contacts: list) -> None:
+        self.records = {id(contact): contact for contact in contacts}
+        self.names = {contact.name.value: contact for contact in contacts}
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the contacts of an address book pickled as a whole by older versions."""
+        self.data = state['data']
+
+    def __len__(self) -> int:
+        """Number of contacts."""
+        return len(self.records)
+
+    def __iter__(self):
+        """Iterate over the contacts in insertion order."""
+        return iter(self.data)
+
+    def save_contact_changes(self, contact: Record = None, old_name: str = None, deleted: bool = False) -> None: 
+        """
+        Save the changes made to the address book.
+
+        The change is queued and written out according to the flush policy: right away
+        ("immediate"), after `flush_count` changes ("count"), by the background flusher every
+        `flush_interval` milliseconds ("interval") or only by `flush` ("exit").
+        """
+        with self.lock:
+            # The journal gets a copy of the contact as it is now, later changes to it are queued on
+            # their own. The other modes write out the whole book and only count the changes.
+            if config.storage_mode == 'journal' and contact is not None and not deleted:
+                contact = restore_record(record_version, *contact.__getstate__())
+            self.pending.append((contact, old_name, deleted))
+            if config.flush_policy == 'immediate':
+                self.flush()
+            elif config.flush_policy == 'count' and len(self.pending) >= config.flush_count:
+                self.flush()
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes that have not been written out yet."""
+        return bool(self.pending)
+
+    def flush(self) -> None:
+        """
+        Write out the queued changes.
+
+        In journal mode only the changed contacts are appended to the journal,
+        otherwise the whole address book is written to the snapshot.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+
+            if config.storage_mode != 'journal' or any(contact is None for contact, _, _ in self.pending):
+                self.compact()
+                self.pending = list()
+                return
+
+            entries = list()
+            for contact, old_name, deleted in self.pending:
+                if deleted:
+                    entries.append(('delete', contact.name.value))
+                else:
+                    entries.append(('put', contact, old_name))
+            Serializer.append_journal(entries, self.journal_path)
+            self.pending = list()
+
+            if os.path.getsize(self.journal_path) > config.journal_compact_size:
+                self.compact()
+
+    def run_flusher(self) -> None:
+        """Background thread of the "interval" flush policy."""
+        while not self.flusher_stop.wait(config.flush_interval / 1000):
+            if config.flush_policy != 'interval':
+                continue # The policy was switched since, e.g. a batch run saves only at the end.
+            try:
+                self.flush()
+            except Exception:
+                pass # The changes stay queued and are retried on the next tick.
+
+    def compact(self) -> None:
+        """Write a new snapshot of the address book and clear the journal."""
+        with self.lock:
+            Serializer.serialize_dict(self.data, self.path)
+            Serializer.truncate_journal(self.journal_path)
+
+    def replay_journal(self) -> None:
+        """
+        Apply the changes from the journal on top of the loaded snapshot.
 
-    def save_contact_changes(self) -> None: 
-        """Save the changes made to the address book."""
-        Serializer.serialize_dict(self, self.path)
+        The entries are applied to the list positions of the contacts by name, deleted contacts
+        leave a gap, and the contacts and the name index are rebuilt once at the end.
+        """
+        contacts = self.data
+        positions = {contact.name.value: position for position, contact in enumerate(contacts)}
+        replayed = False
+        for action, *args in Serializer.replay_journal(self.journal_path):
+            replayed = True
+            if action == 'put':
+                contact, old_name = args
+                # Replace the contact stored under its old name (or under its own name) or append it.
+                position = positions.pop(old_name, None)
+                if position is None:
+                    position = positions.pop(contact.name.value, None)
+                if position is None:
+                    position = len(contacts)
+                    contacts.append(None)
+                contacts[position] = contact
+                positions[contact.name.value] = position
+            if action == 'delete':
+                name, = args
+                position = positions.pop(name, None)
+                if position is not None:
+                    contacts[position] = None
+
+        if not replayed:
+            return
+        self.data = [contact for contact in contacts if contact is not None]
+
+        # The snapshot mode does not read the journal on its own, so fold it into the snapshot.
+        if config.storage_mode != 'journal':
+            self.compact()
+
+    def insert_contact(self, contact: Record) -> None:
+        """Append a contact to the contacts and to the name index."""
+        self.records[id(contact)] = contact
+        self.names[contact.name.value] = contact
+        self.index_contact(contact)
+
+    def remove_contact(self, contact: Record) -> None:
+        """Remove a contact from the contacts and from the name index."""
+        del self.names[contact.name.value]
+        del self.records[id(contact)]
+        self.unindex_contact(contact)
+
+    def get_index(self, key: str):
+        """Return the secondary index `key`, building it on first use."""
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.index_types[key]()
+            for contact in self.records.values():
+                index.add(contact)
+            self.indexes[key] = index
+        return index
+
+    def index_contact(self, contact: Record, obj_type: type = None) -> None:
+        """Add a contact to the indexes of `obj_type` (to all indexes by default)."""
+        for index in self.indexes.values():
+            if obj_type is None or obj_type in index.fields:
+                index.add(contact)
+
+    def unindex_contact(self, contact: Record, obj_type: type = None) -> None:
+        """Remove a contact from the indexes of `obj_type` (from all indexes by default)."""
+        for index in self.indexes.values():
+            if obj_type is None or obj_type in index.fields:
+                index.remove(contact)
+
+    def __contains__(self, contact: Record) -> bool:
+        """Check whether a contact with the same name exists."""
+        return isinstance(contact, Record) and contact.name.value in self.names
 
     def __str__(self) -> str:
         """String representation of the address book."""
-        if not self.data:
+        if not self:
             raise ValueError('AddressBook - The address book does not exist or does not contain any contacts.')
         result = '\n'.join(str(contact) for contact in self)
         result = result.rstrip('\n')
         return result
 
+    def add_contact(self, contact: Record) -> None:
+        """Add a contact to the address book."""
+        with self.lock:
+            if contact in self:
+                raise ValueError(f'AddressBook - The contact "{contact.name}" already exists in the address book.')
+            self.insert_contact(contact)
+            self.save_contact_changes(contact)
+
+    def find_contact(self, find_contact: Record) -> Record:
+        """Find a contact in the address book by name."""
+        contact = self.names.get(find_contact.name.value)
+        if contact is None:
+            raise ValueError(f'AddressBook - No matches found in the address book for "{find_contact.name}".{self.suggest(find_contact.name.value)}')
+        return contact
+
+    def delete_contact(self, delete_contact: Record) -> None:
+        """Delete a contact from the address book by name."""
+        with self.lock:
+            contact = self.find_contact(delete_contact)
+            self.remove_contact(contact)
+            self.save_contact_changes(contact, deleted=True)
+
+    def change_contact(self, flag, contact, obj_type: type, new_value: str = None, old_value: str = None):
+        """Change a contact's details."""
+        with self.lock:
+            contact = self.find_contact(contact)
+            old_name = contact.name.value
+            self.check_rename(flag, obj_type, new_value, old_name)
+            self.unindex_contact(contact, obj_type)
+            try:
+                if flag == 'add':
+                    contact.add_value(obj_type, new_value)
+                if flag == 'delete':
+                    contact.delete_value(obj_type, new_value)
+                if flag == 'change':
+                    contact.change_value(obj_type, new_value, old_value)
+            finally:
+                self.index_contact(contact, obj_type)
+            if contact.name.value != old_name:
+                self.names[contact.name.value] = self.names.pop(old_name)
+            self.save_contact_changes(contact, old_name)
+
+    def find_by(self, obj_type: type, value: str) -> list:
+        """Find the contacts holding a phone number, email address or group."""
+        contacts = self.get_index(obj_type.__name__.lower()).find(value)
+        if not contacts:
+            raise ValueError(f'AddressBook - No matches found in the address book for "{obj_type.__name__} - {value}".')
+        return contacts
+
+    def find_by_phone_suffix(self, digits: str) -> list:
+        """Find the contacts with a phone number ending with the given digits."""
+        digits = phone_suffix(digits)
+        contacts = self.get_index('phone_suffix').find(digits)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with a phone number ending with "{digits}".')
+        return contacts
+
+    def find_by_domain(self, domain: str) -> list:
+        """Find the contacts with an email address at the domain."""
+        domain = domain.removeprefix('@').casefold()
+        contacts = self.get_index('email_domain').find(domain)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with an email address at "{domain}".')
+        return contacts
+
+    def top_domains(self, count: int = 10) -> list:
+        """Get (domain, number of contacts) pairs of the email domains with the most contacts."""
+        if count < 1:
+            raise ValueError(f'AddressBook - The number of domains "{count}" must be positive.')
+        domains = self.get_index('email_domain').top(count)
+        if not domains:
+            raise ValueError('AddressBook - No contacts with email addresses.')
+        return domains
+
+    def find_by_address(self, query: str) -> list:
+        """Find the contacts whose address contains every word of the query, ignoring case."""
+        contacts = self.get_index('address').find(query)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with an address containing "{query}".')
+        return contacts
+
+    def search(self, prefix: str, offset: int = 0, limit: int = None) -> list:
+        """Find a page of the contacts whose names start with `prefix`, ignoring case, in alphabetical order."""
+        limit = config.search_page_size if limit is None else limit
+        contacts = list(itertools.islice(self.get_index('name').find(prefix), offset, offset + limit))
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with names starting with "{prefix}".')
+        return contacts
+
+    def fuzzy(self, name: str, count: int = 5) -> list:
+        """Find (distance, contact) pairs of the `count` names closest to `name` within `fuzzy_max_distance` edits."""
+        if count < 1:
+            raise ValueError(f'AddressBook - The number of matches "{count}" must be positive.')
+        matches = self.get_index('fuzzy').find(name, count, config.fuzzy_max_distance)
+        if not matches:
+            raise ValueError(f'AddressBook - No names similar to "{name}".')
+        return matches
+
+    def suggest(self, name: str) -> str:
+        """Return a "did you mean" hint with the names closest to a name that was not found."""
+        try:
+            matches = self.fuzzy(name, config.fuzzy_suggestions)
+        except ValueError:
+            return ''
+        names = ' or '.join(f'"{contact.name}"' for _, contact in matches)
+        return f' Did you mean {names}?'
+
+    def check_rename(self, flag, obj_type: type, new_value: str, old_name: str) -> None:
+        """Refuse to rename a contact to the name of another existing contact."""
+        if obj_type == Name and flag == 'change' and new_value:
+            new_contact = Record(new_value)
+            if new_contact.name.value != old_name and new_contact in self:
+                raise ValueError(f'AddressBook - The contact "{new_contact.name}" already exists in the address book.')
+
+    def get_upcoming_birthdays(self, days: int = 7) -> list:
+        """Get (date, contact) pairs of the birthdays in the next `days` days, starting today."""
+        days = birthday_window(days)
+        birthdays = self.get_index('birthday').find(datetime.date.today(), days)
+        if not birthdays:
+            raise ValueError(f'AddressBook - No birthdays in the next {days} days.')
+        return birthdays
+
+
+class SQLiteAddressBook(AddressBook):
+    """An address book kept in an SQLite database instead of in memory."""
+
+    def __init__(self) -> None:
+        """Open the database, importing the pickle snapshot into it on first use."""
+        super(AddressBook, self).__init__()
+        self.path = config.sqlite_path
+        self.storage = SQLiteStorage(self.path)
+        self.indexes = dict() # Name indexes kept in memory, see `get_index`.
+        if not self.storage.imported:
+            # Databases created before the import was recorded already hold the imported contacts.
+            self.storage.import_records(() if len(self.storage) else self.load_snapshot())
+
+    @staticmethod
+    def load_snapshot() -> AddressBook:
+        """Load the pickle snapshot (with its journal) for the import."""
+        book = AddressBook()
+        book.flusher_stop.set()
+        return book
+
+    def __len__(self) -> int:
+        """Number of contacts in the database."""
+        return len(self.storage)
+
+    def __iter__(self):
+        """Stream the contacts from the database."""
+        return iter(self.storage)
+
+    def __contains__(self, contact: Record) -> bool:
+        """Check whether a contact with the same name exists."""
+        return self.storage.find(contact.name.value) is not None
+
+    def get_index(self, key: str):
+        """
+        Return the in-memory index `key`, building it from the names in the database on first use.
+
+        Only the indexes keyed by name work here, they hold name-only stubs of the contacts.
+        """
+        index = self.indexes.get(key)
+        if index is None:
+            index = self.index_types[key]()
+            for name in self.storage.names():
+                index.add(Record(name))
+            self.indexes[key] = index
+        return index
+
+    def save_contact_changes(self, *args, **kwargs) -> None:
+        """Changes are written to the database as they are made."""
+
+    def flush(self) -> None:
+        """Every change is already committed to the database."""
+
     def add_contact(self, contact: Record) -> None:
         """Add a contact to the address book."""
         if contact in self:
             raise ValueError(f'AddressBook - The contact "{contact.name}" already exists in the address book.')
-        self.append(contact)
-        self.save_contact_changes()
+        self.storage.insert(contact)
+        self.index_contact(contact)
+
+    def find_by(self, obj_type: type, value: str) -> list:
+        """Find the contacts holding a phone number, email address or group."""
+        contacts = self.storage.find_by(obj_type, obj_type(value).value)
+        if not contacts:
+            raise ValueError(f'AddressBook - No matches found in the address book for "{obj_type.__name__} - {value}".')
+        return contacts
+
+    def find_by_phone_suffix(self, digits: str) -> list:
+        """Find the contacts with a phone number ending with the given digits."""
+        digits = phone_suffix(digits)
+        contacts = self.storage.find_by_phone_suffix(digits)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with a phone number ending with "{digits}".')
+        return contacts
+
+    def find_by_domain(self, domain: str) -> list:
+        """Find the contacts with an email address at the domain."""
+        domain = domain.removeprefix('@').casefold()
+        contacts = self.storage.find_by_domain(domain)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with an email address at "{domain}".')
+        return contacts
+
+    def top_domains(self, count: int = 10) -> list:
+        """Get (domain, number of contacts) pairs of the email domains with the most contacts."""
+        if count < 1:
+            raise ValueError(f'AddressBook - The number of domains "{count}" must be positive.')
+        domains = self.storage.top_domains(count)
+        if not domains:
+            raise ValueError('AddressBook - No contacts with email addresses.')
+        return domains
+
+    def find_by_address(self, query: str) -> list:
+        """Find the contacts whose address contains every word of the query, ignoring case."""
+        contacts = self.storage.find_by_address(query)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with an address containing "{query}".')
+        return contacts
+
+    def search(self, prefix: str, offset: int = 0, limit: int = None) -> list:
+        """Find a page of the contacts whose names start with `prefix`, ignoring case, in alphabetical order."""
+        limit = config.search_page_size if limit is None else limit
+        contacts = self.storage.search(prefix, offset, limit)
+        if not contacts:
+            raise ValueError(f'AddressBook - No contacts with names starting with "{prefix}".')
+        return contacts
 
     def find_contact(self, find_contact: Record) -> Record:
         """Find a contact in the address book by name."""
-        if not find_contact in self:
-            raise ValueError(f'AddressBook - No matches found in the address book for "{find_contact.name}".')
-        return self[self.index(find_contact)]
+        contact = self.storage.find(find_contact.name.value)
+        if contact is None:
+            raise ValueError(f'AddressBook - No matches found in the address book for "{find_contact.name}".{self.suggest(find_contact.name.value)}')
+        return contact
 
     def delete_contact(self, delete_contact: Record) -> None:
         """Delete a contact from the address book by name."""
-        self.remove(self.find_contact(delete_contact))
-        self.save_contact_changes()
+        contact = self.find_contact(delete_contact)
+        self.storage.delete(contact.name.value)
+        self.unindex_contact(contact)
 
     def change_contact(self, flag, contact, obj_type: type, new_value: str = None, old_value: str = None):
-        """Change a contact's details."""
+        """Change a contact's details and write back only the changed field."""
         contact = self.find_contact(contact)
-        if flag == 'add':
-            contact.add_value(obj_type, new_value)
-        if flag == 'delete':
-            contact.delete_value(obj_type, new_value)
-        if flag == 'change':
-            contact.change_value(obj_type, new_value, old_value)
-        self.save_contact_changes()
-
-    def get_upcoming_birthdays(self) -> list:
-        """Get a list of contacts whose birthdays are in the current week."""
-        if not self.data:
-            raise ValueError('AddressBook - The address book does not contain any contacts.')
-        birthday_week_list = list()
-        local_date = datetime.datetime.today().date()
-        local_weekdate_start = local_date - datetime.timedelta(days=local_date.weekday() + 2)
-        local_weekdate_finish = local_date + datetime.timedelta(days=4 - local_date.weekday())
-        for contact in self.contacts:
-            contact.birthday = datetime.datetime.strptime(contact.birthday.value, '%d-%m-%Y').date()
-            if (local_date.month - contact.birthday.month) == 0:
-                if (local_weekdate_start.day <= contact.birthday.day <= local_weekdate_finish.day):
-                    birthday_week_list.append(contact)
-        return birthday_week_list
+        old_name = contact.name.value
+        self.check_rename(flag, obj_type, new_value, old_name)
+        self.unindex_contact(contact, obj_type)
+        try:
+            if flag == 'add':
+                contact.add_value(obj_type, new_value)
+            if flag == 'delete':
+                contact.delete_value(obj_type, new_value)
+            if flag == 'change':
+                contact.change_value(obj_type, new_value, old_value)
+            self.storage.update(contact, old_name, obj_type)
+        except Exception:
+            contact.name = Name(old_name) # The database kept the old name.
+            raise
+        finally:
+            self.index_contact(contact, obj_type)
+
+    def get_upcoming_birthdays(self, days: int = 7) -> list:
+        """Get (date, contact) pairs of the birthdays in the next `days` days, starting today."""
+        days = birthday_window(days)
+        birthdays = self.storage.find_birthdays(calendar_window(datetime.date.today(), days))
+        if not birthdays:
+            raise ValueError(f'AddressBook - No birthdays in the next {days} days.')
+        return birthdays
+
+
+def birthday_window(days) -> int:
+    """Validate the number of days of an upcoming birthdays window."""
+    try:
+        days = int(days)
+    except ValueError:
+        raise ValueError(f'AddressBook - The number of days "{days}" must be an integer.')
+    if days < 1:
+        raise ValueError(f'AddressBook - The number of days "{days}" must be positive.')
+    return days
+
+def phone_suffix(value: str) -> str:
+    """Validate the last digits of a phone number, spaces and dashes between them are dropped."""
+    digits = value.replace(' ', '').replace('-', '')
+    if not digits.isdecimal() or not PhoneSuffixIndex.min_digits <= len(digits) <= 12:
+        raise ValueError(f'AddressBook - "{value}" must be {PhoneSuffixIndex.min_digits} to 12 last digits of a phone number.')
+    return digits
+
+def open_address_book() -> AddressBook:
+    """Open the address book with the storage selected in the configuration."""
+    if config.storage_mode == 'sqlite':
+        return SQLiteAddressBook()
+    return AddressBook()
@@ -1,9 +1,83 @@
-from classes import Record, Name, Birthday, Phone, Email, Address, Group
-from address_book import AddressBook
-from colorama import init, Fore
-
-book = AddressBook()
-commands = dict()
+from classes import Record, Phone, Email, Group, field_types
+from address_book import AddressBook, open_address_book
+from colorama import init, Fore, AnsiToWin32
+import argparse
+import contextlib
+import inspect
+import io
+import os
+import shlex
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import config
+
+try:
+    import readline
+except ImportError:
+    readline = None # Not available on Windows, the prompt works without completion.
+
+book = open_address_book()
+
+def compile_plan(func) -> tuple:
+    """
+    Compile the argument plan of a command from the signature of its function.
+
+    Every parameter becomes a (name, converter) entry, annotated `int` and `float` parameters are
+    converted and all other arguments stay strings. Parameters with a default value are optional,
+    a *args parameter takes one or more of the remaining arguments.
+    Returns the plan, the number of required arguments and the maximum number of arguments (None if unlimited).
+    """
+    parameters = inspect.signature(func).parameters.values()
+    plan = tuple((parameter.name, parameter.annotation if parameter.annotation in (int, float) else str) for parameter in parameters)
+    required = sum(1 for parameter in parameters if parameter.default is inspect.Parameter.empty)
+    variadic = any(parameter.kind is inspect.Parameter.VAR_POSITIONAL for parameter in parameters)
+    return plan, required, None if variadic else len(plan)
+
+class Commands(dict):
+    """Command table that compiles the argument plan of every command when it is registered."""
+
+    def update(self, other: dict) -> None:
+        for name, command_info in other.items():
+            command_info['plan'], command_info['required'], command_info['maximum'] = compile_plan(command_info['func'])
+            self[name] = command_info
+
+commands = Commands()
+
+def parse_arguments(command_info: dict, arguments: str) -> list:
+    """
+    Split the arguments of a command and convert them according to its plan.
+
+    Arguments are separated by whitespace, quotes group words into one argument,
+    e.g. add Bob address "Main street 1". A lone apostrophe, as in O'Neil, is kept as is.
+    """
+    values = None
+    if '"' in arguments or "'" in arguments or '\\' in arguments:
+        try:
+            values = shlex.split(arguments)
+        except ValueError:
+            pass # Unbalanced quotes are part of the values.
+    if values is None:
+        values = arguments.split()
+
+    plan, required, maximum = command_info['plan'], command_info['required'], command_info['maximum']
+    if len(values) < required or maximum is not None and len(values) > maximum:
+        if required == maximum:
+            expected = required
+        else:
+            expected = f'{required} to {maximum}' if maximum is not None else f'{required} or more'
+        raise ValueError(f'InputCommand - Incorrect number of arguments - "{len(values)}". Expected arguments - "{expected}"')
+
+    for index, value in enumerate(values):
+        name, converter = plan[min(index, len(plan) - 1)]
+        if converter is not str:
+            try:
+                values[index] = converter(value)
+            except ValueError:
+                raise ValueError(f'InputCommand - Argument "{name}" must be of type {converter.__name__}, got "{value}".')
+    return values
 
 def error_handler(func):
     """Error handler for program runtime."""
@@ -24,31 +98,22 @@ def input_command(value: str = None):
     else:
         user_input = value
 
-    user_input = user_input.split(maxsplit=1)
-    command = user_input[0].casefold()
+    command, *arguments = user_input.split(maxsplit=1) or ['']
+    command = command.casefold()
+    command_info = commands.get(command)
 
-    if not (command in commands):
+    if command_info is None:
         raise ValueError(f'InputCommand - Command "{command}" not recognized.')
 
-    command_info = commands[command]
-
-    if command_info['param']:
-        if len(user_input) == 1:
-            raise ValueError(f'InputCommand - No arguments provided for command execution.')
-
-        params = user_input[1].split()
-        params_count = len(params)
-        func_params_count = len(command_info['param'].split(' '))
-        
-        if params_count != func_params_count:
-            raise ValueError(f'InputCommand - Incorrect number of arguments - "{params_count}". Expected arguments - "{func_params_count}"')
-
+    params = parse_arguments(command_info, arguments[0] if arguments else '')
     func = command_info['func']
 
-    if command_info['param']:
-        func(*params) if not command_info['print'] else print(f'{Fore.YELLOW}{func(*params)}{Fore.RESET}')
+    if command_info['print']:
+        print(f'{Fore.YELLOW}{func(*params)}{Fore.RESET}')
     else:
-        func() if not command_info['print'] else print(f'{Fore.YELLOW}{func()}{Fore.RESET}')
+        func(*params)
+
+    return True
 
 def hello_bot() -> str:
     """Greetings message."""
@@ -65,11 +130,12 @@ commands.update({
 
 def help() -> str:
     """Return a string with a list of all commands and their descriptions."""
-    result = f'{"Command":<10}{"Parameters":<40}{"Description":<50}\n'
+    width = max(len(key) for key in commands) + 2
+    result = f'{"Command":<{width}}{"Parameters":<40}{"Description":<50}\n'
     for key, value in commands.items():
         param = value['param'] if value['param'] is not None else 'No parameters'
         desc = value['desc']
-        result += f'{key:<10}{param:<40}{desc:<50}\n'
+        result += f'{key:<{width}}{param:<40}{desc:<50}\n'
     result = result.rstrip('\n')
     return result
 
@@ -82,10 +148,17 @@ commands.update({
     },
 })
 
-def add_value_contact(name: str, obj_type: type, value: str) -> None:
+def field_type(obj_type: str) -> type:
+    """Return the field class for a type keyword."""
+    try:
+        return field_types[obj_type.casefold()]
+    except KeyError:
+        raise ValueError(f'InputCommand - Unknown field type "{obj_type}". Expected one of: {", ".join(field_types)}.') from None
+
+def add_value_contact(name: str, obj_type: str, value: str) -> None:
     """Add a contact field."""
     contact = book.find_contact(Record(name))
-    book.change_contact('add', contact, eval(obj_type.capitalize()), value)
+    book.change_contact('add', contact, field_type(obj_type), value)
 
 commands.update({
     'add': {
@@ -96,10 +169,10 @@ commands.update({
     }
 })
 
-def del_value_contact(name: str, obj_type: type, value: str) -> None:
+def del_value_contact(name: str, obj_type: str, value: str) -> None:
     """Delete a contact field."""
     contact = book.find_contact(Record(name))
-    book.change_contact('delete', contact, eval(obj_type.capitalize()), value)
+    book.change_contact('delete', contact, field_type(obj_type), value)
 
 commands.update({
     'del': {
@@ -110,29 +183,30 @@ commands.update({
     }
 })
 
-def change_value_contact(name: str, obj_type: type, new_value: str, old_value: str = None) -> None:
+def change_value_contact(name: str, obj_type: str, new_value: str, old_value: str = None) -> None:
     """Change a contact field."""
     contact = book.find_contact(Record(name))
-    book.change_contact('change', contact, eval(obj_type.capitalize()), new_value, old_value)
+    book.change_contact('change', contact, field_type(obj_type), new_value, old_value)
 
 commands.update({
     'change': {
         'desc': 'Change a contact.', 
         'func': change_value_contact, 
-        'param': '[name] [type] [new_value] [old_value]', 
+        'param': '[name] [type] [new_value] [old_value?]', 
         'print': False
     }
 })
 
-def show_birthdays_week():
-    """Show birthdays in the current week."""
-    return book.get_upcoming_birthdays()
+def show_birthdays(days: int = 7) -> str:
+    """Show birthdays in the next days."""
+    birthdays = book.get_upcoming_birthdays(days)
+    return '\n'.join(f'{date.strftime("%d.%m.%Y, %A")}: {contact.name}' for date, contact in birthdays)
 
 commands.update({
     'birthday': {
-        'desc': 'Show birthdays for the week.', 
-        'func': show_birthdays_week, 
-        'param': None, 
+        'desc': 'Show birthdays in the next days.', 
+        'func': show_birthdays, 
+        'param': '[days?]', 
         'print': True
     }
 })
@@ -164,6 +238,134 @@ commands.update({
     }
 })
 
+def show_contacts(contacts: list) -> str:
+    """Return the string representation of a list of contacts."""
+    return '\n'.join(str(contact) for contact in contacts).rstrip('\n')
+
+def find_by_phone(phone: str) -> str:
+    """Find the contacts with a phone number."""
+    return show_contacts(book.find_by(Phone, phone))
+
+commands.update({
+    'by-phone': {
+        'desc': 'Find contacts by phone number.', 
+        'func': find_by_phone, 
+        'param': '[phone]', 
+        'print': True
+    }
+})
+
+def find_by_email(email: str) -> str:
+    """Find the contacts with an email address."""
+    return show_contacts(book.find_by(Email, email))
+
+commands.update({
+    'by-email': {
+        'desc': 'Find contacts by email address.', 
+        'func': find_by_email, 
+        'param': '[email]', 
+        'print': True
+    }
+})
+
+def find_by_group(group: str) -> str:
+    """Find the contacts in a group."""
+    return show_contacts(book.find_by(Group, group))
+
+commands.update({
+    'by-group': {
+        'desc': 'Find contacts in a group.', 
+        'func': find_by_group, 
+        'param': '[group]', 
+        'print': True
+    }
+})
+
+def find_by_phone_suffix(digits: str) -> str:
+    """Find the contacts with a phone number ending with the digits."""
+    return show_contacts(book.find_by_phone_suffix(digits))
+
+commands.update({
+    'phone-search': {
+        'desc': 'Find contacts by the last digits of the phone.', 
+        'func': find_by_phone_suffix, 
+        'param': '[digits]', 
+        'print': True
+    }
+})
+
+def find_by_domain(domain: str) -> str:
+    """Find the contacts with an email address at a domain."""
+    return show_contacts(book.find_by_domain(domain))
+
+commands.update({
+    'by-domain': {
+        'desc': 'Find contacts by the domain of the email.', 
+        'func': find_by_domain, 
+        'param': '[domain]', 
+        'print': True
+    }
+})
+
+def show_top_domains(count: int = 10) -> str:
+    """Show the email domains with the most contacts."""
+    return '\n'.join(f'{domain}: {contacts}' for domain, contacts in book.top_domains(count))
+
+commands.update({
+    'top-domains': {
+        'desc': 'Show the email domains with the most contacts.', 
+        'func': show_top_domains, 
+        'param': '[count?]', 
+        'print': True
+    }
+})
+
+def search_contacts(prefix: str, page: int = 1) -> str:
+    """Show a page of the contacts whose names start with a prefix."""
+    if page < 1:
+        raise ValueError(f'InputCommand - The page number "{page}" must be positive.')
+    contacts = book.search(prefix, (page - 1) * config.search_page_size, config.search_page_size + 1)
+    result = show_contacts(contacts[:config.search_page_size])
+    if len(contacts) > config.search_page_size:
+        result += f'\n\nMore contacts on the next page: search {shlex.quote(prefix)} {page + 1}'
+    return result
+
+commands.update({
+    'search': {
+        'desc': 'Find contacts by the start of the name.', 
+        'func': search_contacts, 
+        'param': '[prefix] [page?]', 
+        'print': True
+    }
+})
+
+def fuzzy_contacts(name: str, count: int = 5) -> str:
+    """Show the contacts with names similar to a name."""
+    matches = book.fuzzy(name, count)
+    return '\n'.join(f'{contact.name} (edits: {distance})' for distance, contact in matches)
+
+commands.update({
+    'fuzzy': {
+        'desc': 'Find contacts with similar names.', 
+        'func': fuzzy_contacts, 
+        'param': '[name] [count?]', 
+        'print': True
+    }
+})
+
+def find_by_address(*words: str) -> str:
+    """Find the contacts whose address contains all the words."""
+    return show_contacts(book.find_by_address(' '.join(words)))
+
+commands.update({
+    'by-address': {
+        'desc': 'Find contacts by words of the address.', 
+        'func': find_by_address, 
+        'param': '[word] [word?] ...', 
+        'print': True
+    }
+})
+
 def add_new_contact(name: str) -> None:
     """Create a new contact in the address book."""
     book.add_contact(Record(name))
@@ -190,8 +392,22 @@ commands.update({
     }
 })
 
+def save_book() -> None:
+    """Write out the changes that have not been saved yet."""
+    book.flush()
+
+commands.update({
+    'save': {
+        'desc': 'Save the changes.', 
+        'func': save_book, 
+        'param': None,
+        'print': False
+    }
+})
+
 def exit_bot() -> None:
     """Exit the program."""
+    book.flush()
     print(f'{Fore.GREEN}Farewell, my mentor!{Fore.GREEN}')
     exit()
 
@@ -204,9 +420,118 @@ commands.update({
     }
 })
 
+def complete(text: str, state: int) -> str:
+    """Readline completer of the command keywords and, after the command, of the contact names."""
+    if state == 0:
+        if readline.get_line_buffer()[:readline.get_begidx()].strip():
+            try:
+                complete.matches = [contact.name.value for contact in book.search(text, 0, 50)]
+            except ValueError:
+                complete.matches = list()
+        else:
+            complete.matches = [command for command in commands if command.startswith(text.casefold())]
+    return complete.matches[state] if state < len(complete.matches) else None
+
+def signal_handler(signum, frame) -> None:
+    """Save the changes before the program is stopped by a signal."""
+    book.flush()
+    exit()
+
+def run_batch(file) -> bool:
+    """
+    Run the commands of a script, one per line, as a single unit of work.
+
+    Empty lines and lines starting with "#" are skipped. The changes are saved once at the end
+    and a status line per command is reported to stderr. Returns True if every command succeeded.
+    """
+    config.flush_policy = 'exit'
+    report = list()
+    try:
+        for line_number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            report.append((line_number, bool(input_command(line)), line))
+    except SystemExit:
+        report.append((line_number, True, line)) # The "exit" command ends the script.
+    finally:
+        book.flush()
+
+    for line_number, succeeded, line in report:
+        print(f'{line_number}\t{"ok" if succeeded else "error"}\t{line}', file=sys.stderr)
+    return all(succeeded for _, succeeded, _ in report)
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    """
+    Serve one command per connection of the daemon.
+
+    The client sends a command line, the reply is a status line ("ok" or "error")
+    followed by everything the command printed, without colors.
+    """
+
+    def handle(self) -> None:
+        line = self.rfile.readline().decode('utf-8').strip()
+        if not line:
+            return # A probe of another daemon checking whether the socket is in use.
+        output = io.StringIO()
+        stopping = False
+        with contextlib.redirect_stdout(AnsiToWin32(output, strip=True).stream):
+            try:
+                succeeded = bool(input_command(line))
+            except SystemExit:
+                succeeded, stopping = True, True # The "exit" command stops the daemon.
+        self.wfile.write(f'{"ok" if succeeded else "error"}\n{output.getvalue()}'.encode('utf-8'))
+        if stopping:
+            threading.Thread(target=self.server.shutdown).start()
+
+def run_daemon(path: str) -> None:
+    """Serve the commands over a Unix socket until the "exit" command or a signal."""
+    if not hasattr(socketserver, 'UnixStreamServer'):
+        raise SystemExit('The daemon mode needs Unix domain sockets, which are not supported on this platform.')
+
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX) as probe:
+            if probe.connect_ex(path) == 0:
+                raise SystemExit(f'The address book daemon is already running on "{path}".')
+        os.unlink(path) # Stale socket of a daemon that was killed.
+
+    server = socketserver.UnixStreamServer(path, CommandHandler)
+    try:
+        server.serve_forever(poll_interval=0.1)
+    finally:
+        server.server_close()
+        os.unlink(path)
+        book.flush()
+
 def main():
     """Main program function."""
+    parser = argparse.ArgumentParser(description='Address book assistant.')
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE', help='Run the commands from FILE (or stdin) without prompts and exit.')
+    parser.add_argument('--daemon', action='store_true', help=f'Keep the address book in memory and serve the commands on the "{config.socket_path}" Unix socket.')
+    args = parser.parse_args()
+
+    for signum in ('SIGINT', 'SIGTERM', 'SIGHUP'):
+        if hasattr(signal, signum):
+            signal.signal(getattr(signal, signum), signal_handler)
+
+    if args.batch:
+        init(strip=True)
+        if args.batch == '-':
+            succeeded = run_batch(sys.stdin)
+        else:
+            with open(args.batch, encoding='utf-8') as file:
+                succeeded = run_batch(file)
+        exit(0 if succeeded else 1)
+
+    if args.daemon:
+        run_daemon(config.socket_path)
+        return
+
     init()
+    if readline:
+        readline.set_completer(complete)
+        readline.set_completer_delims(' \t')
+        readline.parse_and_bind('tab: complete')
     input_command('hello')
     while True:
         input_command()
@@ -0,0 +1,166 @@
+import argparse
+import gc
+import random
+import re
+import time
+import tracemalloc
+from classes import Record, Name, Birthday, Phone, Email, Address, Group
+import validation
+
+"""
+Benchmarks of the address book building blocks.
+
+Usage:
+    python benchmark.py [benchmark ...] [--count N]
+
+Every benchmark only uses the public API, so the same script can be run against an
+older revision of the project to compare the numbers.
+"""
+
+def make_contact(index: int) -> Record:
+    """Build a contact with a typical set of fields."""
+    contact = Record(f'Contact {index}')
+    contact.add_value(Birthday, f'{index % 28 + 1:02}.{index % 12 + 1:02}.1990')
+    contact.add_value(Phone, f'050{index:07}')
+    contact.add_value(Phone, f'067{index:07}')
+    contact.add_value(Email, f'contact{index}@example.com')
+    contact.add_value(Address, f'Street {index % 1000}')
+    contact.add_value(Group, 'Work')
+    return contact
+
+def benchmark_memory(count: int) -> None:
+    """Measure the memory taken by `count` contacts."""
+    gc.collect()
+    tracemalloc.start()
+    contacts = [make_contact(index) for index in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'memory: {count} contacts, {size / count:.0f} bytes per contact')
+    del contacts
+
+def benchmark_validation(count: int) -> None:
+    """Measure the validations per second of every field type."""
+    samples = {
+        Name: 'Contact Name',
+        Birthday: '15.06.1990',
+        Phone: '0501234567',
+        Email: 'contact.name@example.com',
+        Address: 'Main street 1',
+        Group: 'work',
+    }
+    for obj_type, value in samples.items():
+        start = time.perf_counter()
+        for _ in range(count):
+            obj_type(value)
+        elapsed = time.perf_counter() - start
+        print(f'validation: {obj_type.__name__:<10}{count / elapsed:>12,.0f} validations per second')
+
+def benchmark_email(count: int) -> None:
+    """
+    Check the email validator against the reference pattern and measure its worst-case latency.
+
+    Random short strings are validated by both `validation_email` and `pattern_email` (short
+    enough for the backtracking pattern to finish) and must get the same result. Then inputs
+    that make the reference pattern backtrack exponentially are validated at sizes up to 64 KB.
+    """
+    reference = re.compile(validation.pattern_email)
+    parts = ['a', 'Z', '9', '.', '_', '-', '@', '|', ':', 'com', 'ua', '@ex.com', '!']
+    generator = random.Random(0)
+    accepted = 0
+    for _ in range(count):
+        value = ''.join(generator.choice(parts) for _ in range(generator.randint(1, 8)))
+        expected = bool(reference.fullmatch(value))
+        try:
+            validation.validation_email(value)
+            result = True
+        except ValueError:
+            result = False
+        if result != expected:
+            raise AssertionError(f'email: "{value}" is {"accepted" if result else "rejected"}, the reference pattern disagrees')
+        accepted += result
+    print(f'email: {count} random values agree with the reference pattern ({accepted} accepted)')
+
+    for size in (1024, 4096, 16384, 65536):
+        worst = 0.0
+        for unit, tail in (('A', '!'), ('a1.', '!'), ('A.', '@'), ('a', '@example.c'), ('a@', 'a.c')):
+            value = unit * (size // len(unit)) + tail
+            start = time.perf_counter()
+            try:
+                validation.validation_email(value)
+            except ValueError:
+                pass
+            worst = max(worst, time.perf_counter() - start)
+        print(f'email: {size:>6} bytes, worst case {worst * 1000:.3f} ms')
+
+def benchmark_parse(count: int) -> None:
+    """
+    Measure the cost of parsing the arguments of every command.
+
+    Every command is parsed with plain and with quoted arguments of its full signature,
+    the commands themselves are not run.
+    """
+    import app # Opens the address book of the current directory.
+
+    for command, command_info in app.commands.items():
+        samples = [str(index + 1) if converter is int else f'value{index}' for index, (_, converter) in enumerate(command_info['plan'])]
+        variants = [('plain', ' '.join(samples))]
+        if samples and all(converter is str for _, converter in command_info['plan']):
+            variants.append(('quoted', ' '.join(f'"{sample} x"' for sample in samples)))
+        for label, arguments in variants:
+            start = time.perf_counter()
+            for _ in range(count):
+                app.parse_arguments(command_info, arguments)
+            elapsed = time.perf_counter() - start
+            print(f'parse: {command:<10}{label:<8}{elapsed / count * 1_000_000:>8.3f} µs per command')
+
+def benchmark_fuzzy(count: int) -> None:
+    """Measure the approximate name lookups in an index of `count` names with typos in the queries."""
+    from indexes import NameTrigrams
+
+    generator = random.Random(0)
+    first_names = ['Olena', 'Andriy', 'Iryna', 'Dmytro', 'Oksana', 'Serhiy', 'Natalia', 'Taras', 'Yulia', 'Mykola', 'Kateryna', 'Ivan']
+    consonants, vowels = 'bdhklmnprstvz', 'aeiouy'
+    def surname() -> str:
+        return ''.join(generator.choice(consonants) + generator.choice(vowels) for _ in range(generator.randint(2, 4))).capitalize()
+    names = list({f'{generator.choice(first_names)} {surname()}' for _ in range(count)})
+    index = NameTrigrams()
+    start = time.perf_counter()
+    for name in names:
+        index.add(Record(name))
+    print(f'fuzzy: {len(names)} names indexed in {time.perf_counter() - start:.2f} s')
+
+    queries = list()
+    for name in generator.sample(names, min(200, len(names))):
+        position = generator.randrange(len(name))
+        queries.append(name[:position] + generator.choice('aeiouxz') + name[position + 1:])
+    found = 0
+    start = time.perf_counter()
+    for query in queries:
+        found += bool(index.find(query, 5, 2))
+    elapsed = time.perf_counter() - start
+    print(f'fuzzy: {elapsed / len(queries) * 1000:.3f} ms per lookup, {found} of {len(queries)} queries matched')
+
+benchmarks = {
+    'memory': benchmark_memory,
+    'validation': benchmark_validation,
+    'email': benchmark_email,
+    'parse': benchmark_parse,
+    'fuzzy': benchmark_fuzzy,
+}
+
+def main():
+    """Run the selected benchmarks."""
+    parser = argparse.ArgumentParser(description='Address book benchmarks.')
+    parser.add_argument('benchmark', nargs='*', help=f'Benchmarks to run: {", ".join(benchmarks)} (all by default).')
+    parser.add_argument('--count', type=int, default=100_000, help='Number of contacts or values to use.')
+    args = parser.parse_args()
+
+    for name in args.benchmark:
+        if name not in benchmarks:
+            parser.error(f'Unknown benchmark "{name}".')
+
+    for name in args.benchmark or benchmarks:
+        benchmarks[name](args.count)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
-from validation import validation
+import datetime
+from validation import (
+    validation, register_validator, date_pattern,
+    check_name, check_birthday, check_phone, check_email, check_address, check_group,
+)
 
 """Base class for contact fields"""
 class Field:
@@ -8,6 +12,8 @@ class Field:
     - value (str): Stores the value of the contact field
     """
 
+    __slots__ = ('value',)
+
     # Class constructor
     def __init__(self, value: str) -> None:
         self.value = validation(self, value)
@@ -18,35 +24,107 @@ class Field:
     
     # Checks the equivalence of Field objects
     def __eq__(self, obj: object) -> bool:
+
+        if self is obj:
+            return True
         
         if not isinstance(obj, type(self)):
             return False
                     
         return self.value == obj.value
 
+    # Pickles the field as its class and value string
+    def __reduce__(self) -> tuple:
+        return (restore_field, (type(self), self.value))
+
+    # Restores a field pickled with an instance dictionary by older versions
+    def __setstate__(self, state: dict) -> None:
+        self.value = state['value']
+
 """Class for contact name"""
 class Name(Field):
-    pass
+    __slots__ = ()
 
 """Class for contact birthday"""
 class Birthday(Field):
-    pass
+
+    """
+    Attributes:
+    - value (int): Stores the birthday date as a day ordinal (see datetime.date.toordinal)
+    """
+
+    __slots__ = ()
+
+    # Returns the birthday date
+    @property
+    def date(self) -> datetime.date:
+        return datetime.date.fromordinal(self.value)
+
+    # Returns the birthday in the "DD.MM.YYYY" format
+    def __str__(self) -> str:
+        return self.date.strftime(date_pattern)
+
+    # Orders birthdays by date
+    def __lt__(self, obj: object) -> bool:
+        return self.value < obj.value
+
+    # Returns the age in full years on the given day (today by default)
+    def age(self, today: datetime.date = None) -> int:
+        today = today or datetime.date.today()
+        born = self.date
+        return today.year - born.year - ((today.month, today.day) < (born.month, born.day))
+
+    # Restores a birthday pickled by older versions as a "DD.MM.YYYY" string
+    def __setstate__(self, state: dict) -> None:
+        self.value = birthday_ordinal(state['value'])
 
 """Class for contact phone number"""
 class Phone(Field):
-    pass
+    __slots__ = ()
 
 """Class for contact email address"""
 class Email(Field):
-    pass
+    __slots__ = ()
 
 """Class for contact physical address"""
 class Address(Field):
-    pass
+    __slots__ = ()
+
+"""Base class for fields with a small fixed set of values, shared by all contacts"""
+class InternedField(Field):
+
+    """
+    Every value is represented by a single instance, so comparing fields is an identity check.
+    Subclasses keep their instances in their own `instances` dictionary.
+    """
+
+    __slots__ = ()
+
+    # Validates the value and returns the shared instance for it
+    def __new__(cls, value: str = None):
+        if value is None: # Unpickling of fields written by older versions.
+            return object.__new__(cls)
+        field = object.__new__(cls)
+        return cls.intern(validation(field, value))
+
+    # The shared instance is fully initialized by __new__
+    def __init__(self, value: str = None) -> None:
+        pass
+
+    # Returns the shared instance for an already normalized value
+    @classmethod
+    def intern(cls, value: str):
+        field = cls.instances.get(value)
+        if field is None:
+            field = object.__new__(cls)
+            field.value = value
+            cls.instances[value] = field
+        return field
 
 """Class for contact group"""
-class Group(Field):
-    pass
+class Group(InternedField):
+    __slots__ = ()
+    instances = dict()
 
 """Class for representing a contact"""
 class Record():
@@ -56,6 +134,8 @@ class Record():
     - name (Name): Contact name.
     """
 
+    __slots__ = ('name', 'birthday', 'phone', 'email', 'address', 'group')
+
     # Class constructor
     def __init__(self, name: str) -> None:
         
@@ -131,6 +211,8 @@ class Record():
 
         # Deleting phone number, email address, group.
         if obj_type in [Phone, Email, Group]:
+            if not old_value:
+                raise ValueError(f'Record - The value "{obj_type_name}" to replace must be specified.')
             if not getattr(self, obj_attr_name) or not old_value in getattr(self, obj_attr_name):
                 raise ValueError(f'Record - The specified value "{obj_type_name} - {old_value}" for replacement was not found.')
             getattr(self, obj_attr_name).remove(old_value)
@@ -141,7 +223,8 @@ class Record():
     # Returns the string representation of the contact.
     def __str__(self) -> None:
         result = ''
-        for name_attr, value_attr in vars(self).items():
+        for name_attr in Record.__slots__:
+            value_attr = getattr(self, name_attr)
             if isinstance(value_attr, list):
                 if value_attr:
                     result += f'{name_attr.upper()}: '
@@ -157,7 +240,129 @@ class Record():
     # Checks the equivalence of two contacts.
     def __eq__(self, other) -> bool:
         
-        if not isinstance(other, type(self)):
+        if not isinstance(other, Record):
             return False
         
-        return self.name == other.name
\ No newline at end of file
+        return self.name == other.name
+
+    # Pickles the contact as a versioned tuple of value strings instead of field objects.
+    def __reduce__(self) -> tuple:
+        return (restore_record, (record_version, *self.__getstate__()))
+
+    # Returns the values of the contact fields as strings (tuples for multi-value fields)
+    def __getstate__(self) -> tuple:
+        def values(items):
+            return tuple(item.value for item in items) if items else None
+
+        return (
+            self.name.value,
+            self.birthday.value if self.birthday else None,
+            values(self.phone),
+            values(self.email),
+            self.address.value if self.address else None,
+            values(self.group),
+        )
+
+    # Restores a contact pickled with an instance dictionary by older versions
+    def __setstate__(self, state: dict) -> None:
+        for name_attr in Record.__slots__:
+            setattr(self, name_attr, state.get(name_attr))
+
+"""Class for a contact that is read from the address book file on first access"""
+class LazyRecord(Record):
+
+    """
+    Attributes:
+    - name (Name): Contact name, known without reading the contact.
+    - source (tuple): Record file, offset and length of the serialized contact.
+    """
+
+    __slots__ = ('source',)
+
+    # Class constructor
+    def __init__(self, name: str, source: tuple) -> None:
+        self.name = Name(name)
+        self.source = source
+
+    # Reads the contact on the first access to any of its other fields
+    def __getattr__(self, name_attr: str):
+        if name_attr.startswith('__') or name_attr == 'source':
+            raise AttributeError(name_attr)
+        self.load()
+        return getattr(self, name_attr)
+
+    # Reads the contact before any of its fields is changed, so the change is not overwritten
+    def __setattr__(self, name_attr: str, value) -> None:
+        if name_attr != 'source' and hasattr(self, 'source'):
+            self.load()
+        super().__setattr__(name_attr, value)
+
+    # Fills the fields of the stub that are not set yet with the fields of the stored contact
+    def load(self) -> Record:
+        if not hasattr(self, 'source'):
+            return self
+        record_file, offset, length = self.source
+        record = record_file.load(offset, length)
+        del self.source
+        for name_attr in Record.__slots__:
+            try:
+                object.__getattribute__(self, name_attr)
+            except AttributeError:
+                setattr(self, name_attr, getattr(record, name_attr))
+        return self
+
+    # Returns the string representation of the contact.
+    def __str__(self) -> str:
+        self.load()
+        return super().__str__()
+
+# Validators of the contact fields, new field types register theirs the same way.
+register_validator(Name, check_name)
+register_validator(Birthday, check_birthday)
+register_validator(Phone, check_phone)
+register_validator(Email, check_email)
+register_validator(Address, check_address)
+register_validator(Group, check_group)
+
+# Field types by the keywords used in commands and requests, including their aliases.
+field_types = {obj_type.__name__.casefold(): obj_type for obj_type in (Name, Birthday, Phone, Email, Address, Group)}
+field_types.update({
+    'tel': Phone,
+    'mail': Email,
+    'bday': Birthday,
+})
+
+# Version of the pickled contact layout produced by Record.__reduce__.
+# 1 - birthday as a "DD.MM.YYYY" string, 2 - birthday as a day ordinal.
+record_version = 2
+
+# Restores a pickled field without validating its already normalized value
+def restore_field(obj_type: type, value: str) -> Field:
+    if issubclass(obj_type, InternedField):
+        return obj_type.intern(value)
+    field = object.__new__(obj_type)
+    field.value = value
+    return field
+
+# Restores a pickled contact of the given layout version
+def restore_record(version: int, *state) -> Record:
+    if version not in (1, 2):
+        raise ValueError(f'Record - Unsupported pickled contact version "{version}".')
+
+    name, birthday, phone, email, address, group = state
+    if version == 1 and birthday:
+        birthday = birthday_ordinal(birthday)
+    record = object.__new__(Record)
+    record.name = restore_field(Name, name)
+    record.birthday = restore_field(Birthday, birthday) if birthday else None
+    record.phone = [restore_field(Phone, value) for value in phone] if phone else None
+    record.email = [restore_field(Email, value) for value in email] if email else None
+    record.address = restore_field(Address, address) if address else None
+    record.group = [restore_field(Group, value) for value in group] if group else None
+    return record
+
+# Converts a "DD.MM.YYYY" birthday string (or an already converted ordinal) to a day ordinal
+def birthday_ordinal(value) -> int:
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, date_pattern).date().toordinal()
+    return value
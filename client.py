@@ -0,0 +1,40 @@
+import shlex
+import socket
+import sys
+import config
+
+"""
+Thin client of the address book daemon.
+
+Usage:
+    python app.py --daemon &
+    python client.py find Bob
+    python client.py add Bob address "Main street 1"
+
+The command is forwarded to the daemon over its Unix socket and the output is printed,
+the exit status is 1 if the command failed. The client does not load the address book.
+"""
+
+def send_command(line: str, path: str = config.socket_path) -> tuple:
+    """Send a command line to the daemon and return (succeeded, output)."""
+    with socket.socket(socket.AF_UNIX) as connection:
+        connection.connect(path)
+        connection.sendall(f'{line}\n'.encode('utf-8'))
+        connection.shutdown(socket.SHUT_WR)
+        reply = b''.join(iter(lambda: connection.recv(65536), b'')).decode('utf-8')
+    status, _, output = reply.partition('\n')
+    return status == 'ok', output
+
+def main():
+    """Forward the command line arguments to the daemon."""
+    if len(sys.argv) < 2:
+        raise SystemExit('Usage: python client.py <command> [arguments ...]')
+    try:
+        succeeded, output = send_command(shlex.join(sys.argv[1:]))
+    except (FileNotFoundError, ConnectionRefusedError):
+        raise SystemExit(f'The address book daemon is not running, start it with "python app.py --daemon".')
+    print(output, end='')
+    exit(0 if succeeded else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+
+"""
+Address book settings.
+
+Every setting can be overridden with an environment variable of the same name
+in upper case with the "ADDRESS_BOOK_" prefix, e.g. ADDRESS_BOOK_STORAGE_MODE=journal.
+"""
+
+def setting(name: str, default):
+    """Read a setting from the environment, falling back to `default` (converted to its type)."""
+    value = os.environ.get(f'ADDRESS_BOOK_{name.upper()}')
+    if value is None:
+        return default
+    return type(default)(value)
+
+# Storage settings.
+storage_path = setting('storage_path', 'address_book.pkl') # Path to the address book snapshot.
+storage_mode = setting('storage_mode', 'snapshot') # "snapshot" - rewrite the snapshot on every change, "journal" - append changes to a log, "sqlite" - SQLite database.
+journal_compact_size = setting('journal_compact_size', 1024 * 1024) # Journal size in bytes that triggers compaction into a new snapshot.
+fsync_policy = setting('fsync_policy', 'always') # When written files are synced to disk: "always", "never" or "interval".
+fsync_interval = setting('fsync_interval', 1000) # Minimum milliseconds between syncs in the "interval" fsync policy.
+sqlite_path = setting('sqlite_path', 'address_book.db') # Path to the SQLite database used by the "sqlite" storage mode.
+
+# Search settings.
+search_page_size = setting('search_page_size', 20) # Number of contacts per page of the "search" command.
+fuzzy_max_distance = setting('fuzzy_max_distance', 2) # Most edits between a name and the approximate matches of the "fuzzy" command and "did you mean" hints.
+fuzzy_suggestions = setting('fuzzy_suggestions', 3) # Number of names suggested when a contact is not found.
+
+# Flush settings.
+flush_policy = setting('flush_policy', 'immediate') # When changes are written: "immediate", "count", "interval" or "exit".
+flush_count = setting('flush_count', 50) # Number of queued changes that triggers a write in the "count" policy.
+flush_interval = setting('flush_interval', 1000) # Milliseconds between background writes in the "interval" policy.
+
+# Daemon settings.
+socket_path = setting('socket_path', 'address_book.sock') # Path to the Unix socket served by "python app.py --daemon".
+
+# HTTP server settings.
+http_host = setting('http_host', '127.0.0.1') # Address the HTTP server of "python server.py" listens on.
+http_port = setting('http_port', 8080) # Port of the HTTP server.
+http_keepalive_timeout = setting('http_keepalive_timeout', 5.0) # Seconds an idle keep-alive connection stays open.
+http_page_size = setting('http_page_size', 50) # Default number of items per page of the list endpoints.
+http_max_page_size = setting('http_max_page_size', 1000) # Largest page a client can request.
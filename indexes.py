@@ -0,0 +1,495 @@
+import calendar
+import datetime
+import heapq
+import re
+from array import array
+from bisect import bisect_left
+from collections import ChainMap, Counter
+from classes import Name, Birthday, Phone, Email, Address
+
+"""Indexes kept by the address book to answer lookups without walking every contact."""
+
+class FieldIndex:
+    """Inverted index from the values of one multi-value field type to the contacts holding them."""
+
+    def __init__(self, obj_type: type) -> None:
+        """
+        Initialize the index.
+
+        Parameters:
+            obj_type (type): The field type (Phone, Email, Group) to index.
+        """
+        self.obj_type = obj_type
+        self.fields = (obj_type,) # Field types whose changes require re-indexing the contact.
+        self.attr_name = obj_type.__name__.lower()
+        self.values = dict() # Normalized value -> {id(contact): contact}, in insertion order.
+
+    def field_values(self, contact) -> list:
+        """Return the normalized values of the indexed field of a contact."""
+        return [item.value for item in getattr(contact, self.attr_name) or []]
+
+    def add(self, contact) -> None:
+        """Index the values of a contact."""
+        for value in self.field_values(contact):
+            self.values.setdefault(value, dict())[id(contact)] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the values of a contact from the index."""
+        for value in self.field_values(contact):
+            contacts = self.values.get(value)
+            if contacts is None:
+                continue
+            contacts.pop(id(contact), None)
+            if not contacts:
+                del self.values[value]
+
+    def find(self, value: str) -> list:
+        """Return the contacts holding `value`, normalized the same way as the field itself."""
+        value = self.obj_type(value).value
+        return list(self.values.get(value, dict()).values())
+
+
+class PhoneSuffixIndex:
+    """
+    Index from the last digits of the phone numbers to the contacts holding them.
+
+    Suffixes of `min_digits` to `max_digits` digits are indexed, a longer query is looked up
+    by its last `max_digits` digits and the few matches are checked against the whole query.
+    """
+
+    min_digits = 4
+    max_digits = 7
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Phone,)
+        self.suffixes = dict() # Last digits -> {id(contact): contact}
+
+    def add(self, contact) -> None:
+        """Index the phone numbers of a contact."""
+        for phone in contact.phone or []:
+            for length in range(self.min_digits, self.max_digits + 1):
+                self.suffixes.setdefault(phone.value[-length:], dict())[id(contact)] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the phone numbers of a contact from the index."""
+        for phone in contact.phone or []:
+            for length in range(self.min_digits, self.max_digits + 1):
+                contacts = self.suffixes.get(phone.value[-length:])
+                if contacts is None:
+                    continue
+                contacts.pop(id(contact), None)
+                if not contacts:
+                    del self.suffixes[phone.value[-length:]]
+
+    def find(self, digits: str) -> list:
+        """Return the contacts with a phone number ending with `digits` (at least `min_digits` digits)."""
+        contacts = self.suffixes.get(digits[-self.max_digits:], dict()).values()
+        if len(digits) <= self.max_digits:
+            return list(contacts)
+        return [contact for contact in contacts if any(phone.value.endswith(digits) for phone in contact.phone)]
+
+
+class EmailDomainIndex:
+    """Index from the domains of the email addresses to the contacts, with the number of contacts per domain."""
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Email,)
+        self.domains = dict() # Domain -> {id(contact): contact}, its size is the live count of the domain.
+
+    @staticmethod
+    def contact_domains(contact) -> set:
+        """Return the domains of the email addresses of a contact."""
+        return {email_domain(email.value) for email in contact.email or []}
+
+    def add(self, contact) -> None:
+        """Index the email domains of a contact."""
+        for domain in self.contact_domains(contact):
+            self.domains.setdefault(domain, dict())[id(contact)] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the email domains of a contact from the index."""
+        for domain in self.contact_domains(contact):
+            contacts = self.domains.get(domain)
+            if contacts is None:
+                continue
+            contacts.pop(id(contact), None)
+            if not contacts:
+                del self.domains[domain]
+
+    def find(self, domain: str) -> list:
+        """Return the contacts with an email address at `domain`."""
+        return list(self.domains.get(domain, dict()).values())
+
+    def top(self, count: int) -> list:
+        """Return (domain, number of contacts) pairs of the `count` domains with the most contacts, ties in alphabetical order."""
+        domains = heapq.nsmallest(count, self.domains, key=lambda domain: (-len(self.domains[domain]), domain))
+        return [(domain, len(self.domains[domain])) for domain in domains]
+
+
+class BirthdayIndex:
+    """Calendar index from the day and month of birth to the contacts born on that day."""
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Birthday,)
+        self.days = dict() # (month, day) -> {id(contact): contact}
+
+    @staticmethod
+    def day_key(contact) -> tuple:
+        """Return the (month, day) of the contact's birthday or None."""
+        if not contact.birthday:
+            return None
+        date = contact.birthday.date
+        return (date.month, date.day)
+
+    def add(self, contact) -> None:
+        """Index the birthday of a contact."""
+        key = self.day_key(contact)
+        if key:
+            self.days.setdefault(key, dict())[id(contact)] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the birthday of a contact from the index."""
+        key = self.day_key(contact)
+        contacts = self.days.get(key)
+        if contacts is None:
+            return
+        contacts.pop(id(contact), None)
+        if not contacts:
+            del self.days[key]
+
+    def find(self, start: datetime.date, days: int) -> list:
+        """Return (date, contact) pairs of the birthdays celebrated in the `days` days from `start`."""
+        result = list()
+        for date, keys in calendar_window(start, days):
+            for key in keys:
+                for contact in self.days.get(key, dict()).values():
+                    result.append((date, contact))
+        return result
+
+
+class NameTrie:
+    """Prefix trie over the casefolded contact names."""
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Name,)
+        self.root = dict() # Character -> child node, the None key holds {id(contact): contact} of the names ending here.
+
+    def add(self, contact) -> None:
+        """Index the name of a contact."""
+        node = self.root
+        for char in contact.name.value.casefold():
+            node = node.setdefault(char, dict())
+        node.setdefault(None, dict())[id(contact)] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the name of a contact from the index, pruning the nodes left empty."""
+        path = [self.root]
+        key = contact.name.value.casefold()
+        for char in key:
+            node = path[-1].get(char)
+            if node is None:
+                return
+            path.append(node)
+
+        contacts = path[-1].get(None)
+        if contacts is None:
+            return
+        contacts.pop(id(contact), None)
+        if not contacts:
+            del path[-1][None]
+        for depth in range(len(key), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][key[depth - 1]]
+
+    def find(self, prefix: str):
+        """Yield the contacts whose names start with `prefix`, ignoring case, in alphabetical order."""
+        node = self.root
+        for char in prefix.casefold():
+            node = node.get(char)
+            if node is None:
+                return
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.get(None, dict()).values()
+            stack.extend(node[char] for char in sorted((char for char in node if char is not None), reverse=True))
+
+
+class NameTrigrams:
+    """
+    Trigram index over the casefolded contact names for approximate lookups.
+
+    Contacts are keyed by name, so the index also works with name-only stubs of contacts
+    stored elsewhere. A lookup only measures the edit distance to the names sharing enough
+    trigrams with the query to be within the allowed number of edits. Queries too short for
+    that are looked up in the deletion neighbourhood of the short names instead.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Name,)
+        self.grams = dict() # Trigram -> {name: contact}
+        self.neighbourhoods = dict() # Edits -> {string left by deletions: {name: contact}}, see `neighbourhood`.
+
+    @staticmethod
+    def trigrams(value: str) -> set:
+        """Return the trigrams of a casefolded value padded with spaces."""
+        value = f'  {value.casefold()} '
+        return {value[index:index + 3] for index in range(len(value) - 2)}
+
+    @staticmethod
+    def short_variants(name: str, max_distance: int) -> set:
+        """
+        Return the deletion variants of a name that can match a query too short to be cut.
+
+        Such a query has fewer than 3 * `max_distance` characters, so names of 4 * `max_distance`
+        characters or more are too long to be within `max_distance` edits of it.
+        """
+        name = name.casefold()
+        if len(name) >= 4 * max_distance:
+            return set()
+        return deletions(name, max_distance)
+
+    def add(self, contact) -> None:
+        """Index the name of a contact."""
+        name = contact.name.value
+        for gram in self.trigrams(name):
+            self.grams.setdefault(gram, dict())[name] = contact
+        for max_distance, neighbourhood in self.neighbourhoods.items():
+            for variant in self.short_variants(name, max_distance):
+                neighbourhood.setdefault(variant, dict())[name] = contact
+
+    def remove(self, contact) -> None:
+        """Remove the name of a contact from the index."""
+        name = contact.name.value
+        for gram in self.trigrams(name):
+            contacts = self.grams.get(gram)
+            if contacts is None:
+                continue
+            contacts.pop(name, None)
+            if not contacts:
+                del self.grams[gram]
+        for max_distance, neighbourhood in self.neighbourhoods.items():
+            for variant in self.short_variants(name, max_distance):
+                contacts = neighbourhood.get(variant)
+                if contacts is None:
+                    continue
+                contacts.pop(name, None)
+                if not contacts:
+                    del neighbourhood[variant]
+
+    def neighbourhood(self, max_distance: int) -> dict:
+        """Return the deletion neighbourhood of the short names for `max_distance` edits, building it on first use."""
+        neighbourhood = self.neighbourhoods.get(max_distance)
+        if neighbourhood is None:
+            neighbourhood = self.neighbourhoods[max_distance] = dict()
+            names = dict()
+            for contacts in self.grams.values():
+                names.update(contacts)
+            for name, contact in names.items():
+                for variant in self.short_variants(name, max_distance):
+                    neighbourhood.setdefault(variant, dict())[name] = contact
+        return neighbourhood
+
+    def find(self, value: str, count: int, max_distance: int) -> list:
+        """Return up to `count` (distance, contact) pairs of the names within `max_distance` edits of `value`, closest first."""
+        value = value.casefold()
+        padded = f'  {value} '
+
+        # An edit breaks at most one of the non-overlapping trigrams of the query, so a match holds
+        # all but `max_distance` of them, and at least one of any `max_distance` + 1 of them.
+        # Of the three ways to cut the query, the one with the rarest trigrams is used.
+        cuts = [sorted((self.grams.get(padded[index:index + 3], dict()) for index in range(offset, len(padded) - 2, 3)), key=len) for offset in range(3)]
+        cuts = [postings for postings in cuts if len(postings) > max_distance]
+        if cuts:
+            postings = min(cuts, key=lambda postings: sum(len(contacts) for contacts in postings[:max_distance + 1]))
+            candidates = set()
+            for contacts in postings[:max_distance + 1]:
+                candidates.update(name for name in contacts if abs(len(name) - len(value)) <= max_distance)
+            shared = Counter()
+            for contacts in postings:
+                shared.update(contacts.keys() & candidates)
+            # Every trigram a name misses takes an edit.
+            candidates = [(len(postings) - count_shared, name) for name, count_shared in shared.most_common()]
+            contacts = ChainMap(*postings)
+        else:
+            # The query is too short to be cut. A name within `max_distance` edits of it has a string
+            # in common with it that is left by deleting at most `max_distance` characters of each.
+            neighbourhood = self.neighbourhood(max_distance)
+            contacts = dict()
+            for variant in deletions(value, max_distance):
+                contacts.update(neighbourhood.get(variant, ()))
+            candidates = [(0, name) for name in contacts]
+
+        # The comparisons stop once the names left cannot be closer than the matches found so far.
+        masks = character_masks(value)
+        limit = max_distance
+        result = list()
+        for missing, name in candidates:
+            if missing > limit:
+                break
+            distance = edit_distance(value, name.casefold(), masks)
+            if distance <= limit:
+                result.append((distance, name))
+                if len(result) >= count:
+                    result.sort()
+                    del result[count:]
+                    limit = result[-1][0]
+        result.sort()
+        return [(distance, contacts[name]) for distance, name in result[:count]]
+
+
+class AddressIndex:
+    """
+    Full-text inverted index over the words of the addresses.
+
+    Every indexed contact gets a record id, ids only grow, so the posting list of a word is a
+    sorted array of the ids of the contacts whose address contains the word.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the index."""
+        self.fields = (Address,)
+        self.postings = dict() # Word -> array('I') of record ids in ascending order.
+        self.ids = dict() # id(contact) -> record id
+        self.contacts = dict() # Record id -> contact
+        self.next_id = 0
+
+    def add(self, contact) -> None:
+        """Index the address of a contact."""
+        if not contact.address:
+            return
+        record_id = self.next_id
+        self.next_id += 1
+        self.ids[id(contact)] = record_id
+        self.contacts[record_id] = contact
+        for word in set(words(contact.address.value)):
+            self.postings.setdefault(word, array('I')).append(record_id)
+
+    def remove(self, contact) -> None:
+        """Remove the address of a contact from the index."""
+        record_id = self.ids.pop(id(contact), None)
+        if record_id is None:
+            return
+        del self.contacts[record_id]
+        for word in set(words(contact.address.value)):
+            record_ids = self.postings.get(word)
+            if record_ids is None:
+                continue
+            position = bisect_left(record_ids, record_id)
+            if position < len(record_ids) and record_ids[position] == record_id:
+                del record_ids[position]
+            if not record_ids:
+                del self.postings[word]
+
+    def find(self, query: str) -> list:
+        """Return the contacts whose address contains every word of the query."""
+        postings = sorted((self.postings.get(word, array('I')) for word in set(words(query))), key=len)
+        if not postings:
+            return list()
+        record_ids = postings[0]
+        for other in postings[1:]:
+            if not record_ids:
+                break
+            record_ids = intersect(record_ids, other)
+        return [self.contacts[record_id] for record_id in record_ids]
+
+
+def email_domain(value: str) -> str:
+    """Return the domain of an email address, the part after the last "@"."""
+    return value.rpartition('@')[2]
+
+def words(value: str) -> list:
+    """Split a text into casefolded words."""
+    return re.findall(r'\w+', value.casefold())
+
+def intersect(small: array, large: array) -> array:
+    """
+    Intersect two sorted arrays of ids with a galloping merge.
+
+    For every id of the smaller array the larger one is searched from the previous position
+    with steps doubling until the id is passed, then by binary search within the last step,
+    so the cost grows with the size of the smaller array and only logarithmically with the larger.
+    """
+    result = array('I')
+    low, size = 0, len(large)
+    for value in small:
+        step = 1
+        while low + step < size and large[low + step] < value:
+            step *= 2
+        low = bisect_left(large, value, low + step // 2, min(low + step + 1, size))
+        if low == size:
+            break
+        if large[low] == value:
+            result.append(value)
+            low += 1
+    return result
+
+def character_masks(value: str) -> dict:
+    """Return the bit mask of the positions of every character of `value`, see `edit_distance`."""
+    masks = dict()
+    for position, char in enumerate(value):
+        masks[char] = masks.get(char, 0) | 1 << position
+    return masks
+
+def edit_distance(first: str, second: str, masks: dict = None) -> int:
+    """
+    Return the Levenshtein distance between two strings.
+
+    Uses Myers' bit-parallel algorithm, a whole column of the distance matrix is updated
+    with a few integer operations per character of `second`. `masks` are the
+    `character_masks` of `first`, passed in when `first` is compared with many strings.
+    """
+    if not first:
+        return len(second)
+    masks = character_masks(first) if masks is None else masks
+    full, last = (1 << len(first)) - 1, 1 << len(first) - 1
+    positive, negative, distance = full, 0, len(first)
+    for char in second:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = negative | ~(horizontal | positive) & full
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = (horizontal_positive << 1 | 1) & full
+        horizontal_negative = horizontal_negative << 1 & full
+        positive = horizontal_negative | ~(vertical | horizontal_positive) & full
+        negative = horizontal_positive & vertical
+    return distance
+
+def deletions(value: str, depth: int) -> set:
+    """Return the strings left by deleting at most `depth` characters of `value`."""
+    result = level = {value}
+    for _ in range(depth):
+        level = {variant[:index] + variant[index + 1:] for variant in level for index in range(len(variant))}
+        result = result | level
+    return result
+
+def calendar_window(start: datetime.date, days: int):
+    """
+    Yield every date of the window together with the (month, day) birthdays celebrated on it.
+
+    The window is at most a year long, every birthday is celebrated once in it. In non-leap
+    years birthdays on February 29 are celebrated on February 28.
+    """
+    celebrated = set()
+    for offset in range(days):
+        date = start + datetime.timedelta(days=offset)
+        keys = [(date.month, date.day)]
+        if (date.month, date.day) == (2, 28) and not calendar.isleap(date.year):
+            keys.append((2, 29))
+        keys = [key for key in keys if key not in celebrated]
+        if not keys:
+            break # The window wrapped around a whole year.
+        celebrated.update(keys)
+        yield date, keys
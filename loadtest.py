@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from urllib.parse import quote
+import config
+
+"""
+Load test of the address book HTTP server.
+
+Usage:
+    python server.py &
+    python loadtest.py [--connections N] [--requests N] [--writes RATIO]
+
+Every connection is kept alive and sends its requests one after another. Reads look up
+random contacts and list pages, writes change the address of a contact created for the test
+and deleted at the end.
+"""
+
+class Connection:
+    """Keep-alive HTTP/1.1 connection sending JSON requests."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: dict = None) -> tuple:
+        """Send a request and return (status, JSON payload or None)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(data)}\r\n'
+            f'Content-Type: application/json\r\n\r\n'.encode('latin-1') + data
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = dict()
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, json.loads(payload) if payload else None
+
+    async def close(self) -> None:
+        """Close the connection."""
+        if self.writer is not None:
+            self.writer.close()
+            await self.writer.wait_closed()
+            self.writer = None
+
+
+async def run_client(host: str, port: int, names: list, requests: int, writes: float, generator: random.Random, latencies: list, errors: list) -> None:
+    """Send `requests` requests over one connection, recording the latency of each one."""
+    connection = Connection(host, port)
+    try:
+        for index in range(requests):
+            if generator.random() < writes:
+                method, path, body = 'PUT', f'/contacts/{quote("Load Test")}/fields', {'type': 'address', 'new_value': f'Street {index % 1000}'}
+            elif names and generator.random() < 0.8:
+                method, path, body = 'GET', f'/contacts/{quote(generator.choice(names))}', None
+            else:
+                method, path, body = 'GET', f'/contacts?offset={generator.randrange(max(len(names), 1))}&limit=10', None
+            start = time.perf_counter()
+            status, _ = await connection.request(method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append((method, path, status))
+    finally:
+        await connection.close()
+
+async def run(host: str, port: int, connections: int, requests: int, writes: float) -> None:
+    """Run the load test and print the throughput and latency percentiles."""
+    setup = Connection(host, port)
+    _, listing = await setup.request('GET', f'/contacts?limit={config.http_max_page_size}')
+    names = [contact['name'] for contact in listing['contacts']]
+    if writes:
+        await setup.request('POST', '/contacts', {'name': 'Load Test'})
+
+    latencies, errors = list(), list()
+    generator = random.Random(0)
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(run_client(host, port, names, requests, writes, generator, latencies, errors) for _ in range(connections)))
+    finally:
+        elapsed = time.perf_counter() - start
+        if writes:
+            await setup.request('DELETE', f'/contacts/{quote("Load Test")}')
+        await setup.close()
+
+    latencies.sort()
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    print(f'{len(latencies)} requests over {connections} connections in {elapsed:.2f} s, {len(latencies) / elapsed:,.0f} requests per second')
+    print(f'latency: p50 {percentiles[49] * 1000:.2f} ms, p99 {percentiles[98] * 1000:.2f} ms, max {latencies[-1] * 1000:.2f} ms')
+    if errors:
+        print(f'{len(errors)} failed requests, first: {errors[0]}')
+
+def main():
+    """Parse the arguments and run the load test."""
+    parser = argparse.ArgumentParser(description='Address book HTTP server load test.')
+    parser.add_argument('--host', default=config.http_host, help='Address of the server.')
+    parser.add_argument('--port', type=int, default=config.http_port, help='Port of the server.')
+    parser.add_argument('--connections', type=int, default=50, help='Number of concurrent keep-alive connections.')
+    parser.add_argument('--requests', type=int, default=200, help='Number of requests per connection.')
+    parser.add_argument('--writes', type=float, default=0.05, help='Share of the requests that change a contact.')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.host, args.port, args.connections, args.requests, args.writes))
+
+if __name__ == "__main__":
+    main()
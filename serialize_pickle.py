@@ -1,5 +1,10 @@
 import pickle
+import struct
+import threading
+import time
 import os
+from classes import LazyRecord
+import config
 
 """Class for serializing and deserializing the address book."""
 class Serializer:
@@ -10,26 +15,218 @@ class Serializer:
     - path (str): Stores the path to the address book file
     """
 
+    last_sync = 0.0 # Time of the last fsync for the "interval" fsync policy.
+    unreadable = set() # Snapshots that failed to load and were recovered from their previous generation.
+
     # Serialization
     @staticmethod
     def serialize_dict(contacts: list, path: str):
-        """Serialize the dictionary."""
+        """
+        Serialize the dictionary.
+
+        Every contact is written as its own pickle followed by an offset table keyed by name
+        (see RecordFile). Contacts that were never read are copied from the old file as is.
+
+        The snapshot is written to a temporary file, synced according to the fsync policy and
+        renamed into place; the previous snapshot is kept as "<path>.prev" for recovery. A snapshot
+        that could not be read replaces the unreadable file and keeps the good previous generation.
+        """
+        temp_path = f'{path}.tmp'
         try:
-            with open(path, 'wb') as file:
-                pickle.dump(contacts, file)
+            offsets = dict()
+            record_files = set()
+            with open(temp_path, 'wb') as file:
+                file.write(RecordFile.magic)
+                for contact in contacts:
+                    source = getattr(contact, 'source', None)
+                    if source:
+                        record_file, offset, length = source
+                        record_files.add(record_file)
+                        blob = record_file.read(offset, length)
+                    else:
+                        blob = pickle.dumps(contact, protocol=pickle.HIGHEST_PROTOCOL)
+                    offsets[contact.name.value] = (file.tell(), len(blob))
+                    file.write(blob)
+                table_offset = file.tell()
+                pickle.dump(offsets, file, protocol=pickle.HIGHEST_PROTOCOL)
+                file.write(RecordFile.footer.pack(table_offset))
+                Serializer.sync(file)
+            # Open files cannot be renamed or replaced on Windows.
+            for record_file in record_files:
+                record_file.close()
+            if os.path.exists(path) and path not in Serializer.unreadable:
+                os.replace(path, f'{path}.prev')
+                for record_file in record_files:
+                    if record_file.path == path:
+                        record_file.path = f'{path}.prev'
+            os.replace(temp_path, path)
+            Serializer.sync_directory(path)
+            Serializer.unreadable.discard(path)
         except Exception as e:
             raise Exception(f'Serializer - Error during serialization of the dictionary: {e}')
 
+        # Contacts that are still unread now have to be read from the new file.
+        record_file = None
+        for contact in contacts:
+            if getattr(contact, 'source', None):
+                record_file = record_file or RecordFile(path)
+                contact.source = (record_file, *offsets[contact.name.value])
+
     # Deserialization
     @staticmethod
     def deserialize_dict(path):
-        """Deserialize the dictionary."""
-        if not os.path.exists(path) or not os.path.getsize(path) > 0:
-            return []
-        
+        """
+        Deserialize the dictionary.
+
+        Contacts of a record file are returned as LazyRecord stubs that are read on first access,
+        files written by older versions (a single pickle) are read in full.
+
+        A missing, empty or unreadable snapshot is recovered from the previous generation.
+        """
+        previous_path = f'{path}.prev'
+        if not os.path.exists(previous_path):
+            if not os.path.exists(path) or not os.path.getsize(path) > 0:
+                return []
+            previous_path = None
+
+        try:
+            contacts = Serializer.load_snapshot(path)
+            Serializer.unreadable.discard(path)
+            return contacts
+        except Exception as e:
+            if previous_path is None:
+                raise Exception(f'Serializer - Error during deserialization of the dictionary: {e}')
+            Serializer.unreadable.add(path)
+
+        try:
+            return Serializer.load_snapshot(previous_path)
+        except Exception as e:
+            raise Exception(f'Serializer - Error during deserialization of the dictionary and its previous generation: {e}')
+
+    # Snapshot loading
+    @staticmethod
+    def load_snapshot(path: str) -> list:
+        """Load the contacts of one snapshot file."""
+        if not os.path.getsize(path) > 0:
+            raise ValueError(f'The file "{path}" is empty.')
+
+        if RecordFile.is_record_file(path):
+            record_file = RecordFile(path)
+            return [LazyRecord(name, (record_file, *source)) for name, source in record_file.offsets.items()]
+
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    # Syncing
+    @staticmethod
+    def sync(file) -> None:
+        """Flush a written file to disk according to the fsync policy."""
+        if config.fsync_policy == 'never':
+            return
+
+        if config.fsync_policy == 'interval':
+            now = time.monotonic()
+            if (now - Serializer.last_sync) * 1000 < config.fsync_interval:
+                return
+            Serializer.last_sync = now
+
+        file.flush()
+        os.fsync(file.fileno())
+
+    @staticmethod
+    def sync_directory(path: str) -> None:
+        """Make a rename in the directory of `path` durable (not supported on Windows)."""
+        if config.fsync_policy == 'never' or os.name == 'nt':
+            return
+
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+    # Journal append
+    @staticmethod
+    def append_journal(entries: list, path: str):
+        """Append change entries to the journal."""
         try:
-            if os.path.exists(path) and os.path.getsize(path) > 0:
-                with open(path, 'rb') as file:
-                    return pickle.load(file)
+            with open(path, 'ab') as file:
+                for entry in entries:
+                    pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+                Serializer.sync(file)
         except Exception as e:
-            raise Exception(f'Serializer - Error during deserialization of the dictionary: {e}')
+            raise Exception(f'Serializer - Error while appending to the journal: {e}')
+
+    # Journal replay
+    @staticmethod
+    def replay_journal(path: str):
+        """Yield the change entries stored in the journal in the order they were written."""
+        if not os.path.exists(path):
+            return
+
+        with open(path, 'rb') as file:
+            while True:
+                try:
+                    yield pickle.load(file)
+                except EOFError:
+                    return
+                except pickle.UnpicklingError:
+                    # An entry cut off by a crash in the middle of an append - everything before it is valid.
+                    return
+
+    # Journal truncation
+    @staticmethod
+    def truncate_journal(path: str):
+        """Remove all entries from the journal."""
+        if os.path.exists(path):
+            os.remove(path)
+
+"""Class for reading an address book file that stores every contact separately."""
+class RecordFile:
+
+    """
+    Attributes:
+    - path (str): Stores the path to the address book file
+    - offsets (dict): Stores the contact name -> (offset, length) table of the file
+
+    File layout: magic, one pickle per contact, pickled offset table, 8-byte table offset.
+    """
+
+    magic = b'ADDRESS-BOOK-RECORDS-1\n'
+    footer = struct.Struct('<Q')
+
+    # Class constructor
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None # Opened on the first read and closed by `close`.
+        with open(path, 'rb') as file:
+            file.seek(-self.footer.size, os.SEEK_END)
+            table_offset, = self.footer.unpack(file.read(self.footer.size))
+            file.seek(table_offset)
+            self.offsets = pickle.load(file)
+
+    @classmethod
+    def is_record_file(cls, path: str) -> bool:
+        """Check whether the file at `path` is a record file."""
+        with open(path, 'rb') as file:
+            return file.read(len(cls.magic)) == cls.magic
+
+    def read(self, offset: int, length: int) -> bytes:
+        """Read the serialized contact stored at `offset`."""
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, 'rb')
+            self.file.seek(offset)
+            return self.file.read(length)
+
+    def close(self) -> None:
+        """Close the file until the next read, so that it can be renamed."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def load(self, offset: int, length: int):
+        """Read and deserialize the contact stored at `offset`."""
+        return pickle.loads(self.read(offset, length))
@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import signal
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+from classes import Record, Name, Phone, Email, Group, field_types
+from address_book import open_address_book
+import config
+
+"""
+HTTP/JSON API of the address book.
+
+Usage:
+    python server.py [--host HOST] [--port PORT]
+
+Endpoints:
+    GET    /contacts?offset=0&limit=50          List the contacts, optionally filtered by
+                                                phone=, email=, group= or address= (all the words).
+    POST   /contacts                            Create a contact: {"name": "Bob"}.
+    GET    /contacts/<name>                     Get a contact.
+    DELETE /contacts/<name>                     Delete a contact.
+    POST   /contacts/<name>/fields              Add a field value: {"type": "phone", "value": "0501234567"}.
+    PUT    /contacts/<name>/fields              Change a field: {"type": "phone", "new_value": "...", "old_value": "..."}.
+    DELETE /contacts/<name>/fields              Delete a field value: {"type": "phone", "value": "..."}.
+    GET    /birthdays?days=7&offset=0&limit=50  List the upcoming birthdays.
+
+Connections are kept alive between requests. Reads are served concurrently, changes are
+applied one at a time in a worker thread while no read is in progress.
+"""
+
+class HTTPError(Exception):
+    """Error answered with an HTTP status and a JSON {"error": message} body."""
+
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class ReadWriteLock:
+    """Asyncio lock shared by any number of readers or held by a single writer, writers go first."""
+
+    def __init__(self) -> None:
+        self.condition = asyncio.Condition()
+        self.readers = 0
+        self.writing = False
+        self.waiting_writers = 0
+
+    @contextlib.asynccontextmanager
+    async def read(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: not self.writing and not self.waiting_writers)
+            self.readers += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.readers -= 1
+                self.condition.notify_all()
+
+    @contextlib.asynccontextmanager
+    async def write(self):
+        async with self.condition:
+            self.waiting_writers += 1
+            try:
+                await self.condition.wait_for(lambda: not self.writing and not self.readers)
+            finally:
+                self.waiting_writers -= 1
+            self.writing = True
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+
+def contact_json(contact: Record) -> dict:
+    """JSON representation of a contact, every field by its string value."""
+    result = dict()
+    for name_attr in Record.__slots__:
+        value_attr = getattr(contact, name_attr)
+        if name_attr in ('phone', 'email', 'group'):
+            result[name_attr] = [str(item) for item in value_attr or []]
+        else:
+            result[name_attr] = str(value_attr) if value_attr else None
+    return result
+
+def page(items, total: int, query: dict, key: str, convert) -> dict:
+    """Slice one page of `items` according to the offset and limit of the query."""
+    offset = query_int(query, 'offset', 0)
+    limit = min(query_int(query, 'limit', config.http_page_size), config.http_max_page_size)
+    return {
+        key: [convert(item) for item in itertools.islice(items, offset, offset + limit)],
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+    }
+
+def query_int(query: dict, name: str, default: int) -> int:
+    """Read a non-negative integer parameter of the query string."""
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'Server - The parameter "{name}" must be an integer.')
+    if value < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'Server - The parameter "{name}" must not be negative.')
+    return value
+
+def body_value(body: dict, name: str, required: bool = True) -> str:
+    """Read a string member of the JSON body."""
+    value = body.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str):
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'Server - The body must contain "{name}" as a string.')
+    return value
+
+def body_field_type(body: dict) -> type:
+    """Resolve the field type named by the "type" member of the JSON body."""
+    obj_type = body_value(body, 'type')
+    if obj_type.casefold() not in field_types:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f'Server - Unknown field type "{obj_type}". Expected one of: {", ".join(field_types)}.')
+    return field_types[obj_type.casefold()]
+
+
+class AddressBookServer:
+    """Asyncio HTTP server answering the API requests from one address book."""
+
+    # Filters of the contacts list: query parameter -> field type.
+    filters = {'phone': Phone, 'email': Email, 'group': Group}
+
+    def __init__(self, book) -> None:
+        """
+        Initialize the server.
+
+        Parameters:
+            book (AddressBook): The address book to serve.
+        """
+        self.book = book
+        self.lock = ReadWriteLock()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer the requests of one keep-alive connection until it is closed or idle."""
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), config.http_keepalive_timeout)
+                except (asyncio.TimeoutError, ConnectionError, ValueError):
+                    break
+                if not request_line.strip():
+                    break
+
+                keep_alive = False # A malformed request ends the connection.
+                try:
+                    method, target, version, headers, body = await self.read_request(request_line, reader)
+                    keep_alive = self.keep_alive(version, headers)
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {'error': str(e)}
+                except Exception as e:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f'Server - Internal error: {e}'}
+
+                self.write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def read_request(self, request_line: bytes, reader: asyncio.StreamReader) -> tuple:
+        """Parse the request line, the headers and the JSON body of a request."""
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Server - Malformed request line.')
+
+        headers = dict()
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'transfer-encoding' in headers:
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, 'Server - Chunked request bodies are not supported, send Content-Length.')
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, 'Server - Malformed Content-Length.')
+        if length > 1024 * 1024:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'Server - The request body is too large.')
+
+        body = dict()
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except asyncio.IncompleteReadError:
+                raise ConnectionError('The connection was closed in the middle of the request.')
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'Server - The request body is not valid JSON.')
+            if not isinstance(body, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, 'Server - The request body must be a JSON object.')
+        return method.upper(), target, version, headers, body
+
+    @staticmethod
+    def keep_alive(version: str, headers: dict) -> bool:
+        """Whether the connection stays open after the response."""
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    @staticmethod
+    def write_response(writer: asyncio.StreamWriter, status: HTTPStatus, payload, keep_alive: bool) -> None:
+        """Write a JSON response, an empty one for 204."""
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [
+            f'HTTP/1.1 {status.value} {status.phrase}',
+            f'Content-Length: {len(body)}',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        if body:
+            head.append('Content-Type: application/json; charset=utf-8')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+    async def dispatch(self, method: str, target: str, body: dict) -> tuple:
+        """Route a request to its handler, returning (status, payload)."""
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+
+        try:
+            if parts == ['contacts']:
+                if method == 'GET':
+                    async with self.lock.read():
+                        return HTTPStatus.OK, self.list_contacts(query)
+                if method == 'POST':
+                    return HTTPStatus.CREATED, await self.write(self.create_contact, body_value(body, 'name'))
+
+            elif len(parts) == 2 and parts[0] == 'contacts':
+                if method == 'GET':
+                    async with self.lock.read():
+                        return HTTPStatus.OK, contact_json(self.find_contact(parts[1]))
+                if method == 'DELETE':
+                    await self.write(self.delete_contact, parts[1])
+                    return HTTPStatus.NO_CONTENT, None
+
+            elif len(parts) == 3 and parts[0] == 'contacts' and parts[2] == 'fields':
+                if method in ('POST', 'PUT', 'DELETE'):
+                    return HTTPStatus.OK, await self.write(self.change_contact, method, parts[1], body)
+
+            elif parts == ['birthdays']:
+                if method == 'GET':
+                    async with self.lock.read():
+                        return HTTPStatus.OK, self.list_birthdays(query)
+
+            else:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f'Server - No such endpoint "{url.path}".')
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+        raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f'Server - Method "{method}" is not allowed on "{url.path}".')
+
+    async def write(self, func, *args):
+        """Apply a change alone, in a worker thread so that saving it does not block the connections."""
+        async with self.lock.write():
+            return await asyncio.to_thread(func, *args)
+
+    def find_contact(self, name: str) -> Record:
+        """Find a contact by name, answering 404 if there is none."""
+        contact = Record(name)
+        if contact not in self.book:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f'Server - No contact named "{contact.name}".')
+        return self.book.find_contact(contact)
+
+    def list_contacts(self, query: dict) -> dict:
+        """One page of all contacts or of the contacts holding a phone, email, group or address words."""
+        if 'address' in query:
+            try:
+                contacts = self.book.find_by_address(query['address'][0])
+            except ValueError:
+                contacts = list()
+            return page(iter(contacts), len(contacts), query, 'contacts', contact_json)
+        for name, obj_type in self.filters.items():
+            if name in query:
+                try:
+                    contacts = self.book.find_by(obj_type, query[name][0])
+                except ValueError:
+                    contacts = list() # No matches is an empty page, not an error.
+                return page(iter(contacts), len(contacts), query, 'contacts', contact_json)
+        return page(iter(self.book), len(self.book), query, 'contacts', contact_json)
+
+    def list_birthdays(self, query: dict) -> dict:
+        """One page of the upcoming birthdays."""
+        days = query_int(query, 'days', 7)
+        try:
+            birthdays = self.book.get_upcoming_birthdays(days)
+        except ValueError:
+            if days < 1:
+                raise
+            birthdays = list() # No birthdays in the window is an empty page, not an error.
+        return page(iter(birthdays), len(birthdays), query, 'birthdays', lambda item: {'date': item[0].isoformat(), 'contact': contact_json(item[1])})
+
+    def create_contact(self, name: str) -> dict:
+        """Create a new contact."""
+        contact = Record(name)
+        self.book.add_contact(contact)
+        return contact_json(self.book.find_contact(contact))
+
+    def delete_contact(self, name: str) -> None:
+        """Delete a contact."""
+        self.book.delete_contact(self.find_contact(name))
+
+    def change_contact(self, method: str, name: str, body: dict) -> dict:
+        """Add (POST), change (PUT) or delete (DELETE) a field value of a contact."""
+        contact = self.find_contact(name)
+        obj_type = body_field_type(body)
+        if method == 'POST':
+            self.book.change_contact('add', contact, obj_type, body_value(body, 'value'))
+        if method == 'DELETE':
+            self.book.change_contact('delete', contact, obj_type, body_value(body, 'value'))
+        if method == 'PUT':
+            new_value = body_value(body, 'new_value')
+            self.book.change_contact('change', contact, obj_type, new_value, body_value(body, 'old_value', required=False))
+            if obj_type == Name:
+                contact = Record(new_value)
+        return contact_json(self.book.find_contact(contact))
+
+    async def serve(self, host: str, port: int) -> None:
+        """Serve the API until the process is stopped, then save the changes."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in ('SIGINT', 'SIGTERM'):
+            with contextlib.suppress(NotImplementedError, AttributeError):
+                loop.add_signal_handler(getattr(signal, signum), stopped.set)
+
+        print(f'Serving the address book on http://{host}:{port}')
+        async with server:
+            await stopped.wait()
+        async with self.lock.write():
+            await asyncio.to_thread(self.book.flush)
+
+
+def main():
+    """Run the HTTP server."""
+    parser = argparse.ArgumentParser(description='Address book HTTP/JSON API.')
+    parser.add_argument('--host', default=config.http_host, help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=config.http_port, help='Port to listen on.')
+    args = parser.parse_args()
+
+    asyncio.run(AddressBookServer(open_address_book()).serve(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+import sqlite3
+from classes import Record, Name, Birthday, Phone, Email, Address, Group
+from indexes import words, email_domain
+import config
+
+"""Class for storing the address book in an SQLite database."""
+class SQLiteStorage:
+
+    """
+    Attributes:
+    - path (str): Stores the path to the database file
+    - connection (sqlite3.Connection): Stores the open database connection
+
+    Scalar fields live in the "contacts" table, multi-value fields in their own tables
+    with one row per value, so a change touches only the rows of the changed contact.
+    """
+
+    # Tables of multi-value fields.
+    value_tables = {Phone: 'phones', Email: 'emails', Group: 'contact_groups'}
+
+    # Columns of single-value fields in the "contacts" table.
+    value_columns = {Name: 'name', Birthday: 'birthday', Address: 'address'}
+
+    schema = '''
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            birthday TEXT,
+            address TEXT
+        );
+        CREATE TABLE IF NOT EXISTS phones (
+            contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS emails (
+            contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS contact_groups (
+            contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+            value TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS address_words (
+            contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE,
+            word TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS domain_counts (
+            domain TEXT PRIMARY KEY,
+            contacts INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS domain_counts_contacts ON domain_counts(contacts DESC, domain);
+        CREATE INDEX IF NOT EXISTS address_words_word ON address_words(word, contact_id);
+        CREATE INDEX IF NOT EXISTS address_words_contact ON address_words(contact_id);
+        CREATE INDEX IF NOT EXISTS contacts_birthday_day ON contacts(substr(birthday, 1, 5));
+        CREATE INDEX IF NOT EXISTS contacts_name_key ON contacts(casefold(name));
+        CREATE INDEX IF NOT EXISTS phones_value ON phones(value);
+        CREATE INDEX IF NOT EXISTS phones_contact ON phones(contact_id);
+        CREATE INDEX IF NOT EXISTS phones_reversed ON phones(reverse(value));
+        CREATE INDEX IF NOT EXISTS emails_value ON emails(value);
+        CREATE INDEX IF NOT EXISTS emails_contact ON emails(contact_id);
+        CREATE INDEX IF NOT EXISTS emails_domain ON emails(email_domain(value), contact_id);
+        CREATE INDEX IF NOT EXISTS contact_groups_value ON contact_groups(value);
+        CREATE INDEX IF NOT EXISTS contact_groups_contact ON contact_groups(contact_id);
+    '''
+
+    # Class constructor
+    def __init__(self, path: str) -> None:
+        self.path = path
+        try:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            # Unicode-aware case folding for the name search, the "contacts_name_key" index is built on it.
+            self.connection.create_function('casefold', 1, str.casefold, deterministic=True)
+            # Reversed phone numbers turn the search by the last digits into a prefix search on the "phones_reversed" index.
+            self.connection.create_function('reverse', 1, lambda value: value[::-1], deterministic=True)
+            self.connection.create_function('email_domain', 1, email_domain, deterministic=True)
+            self.connection.execute('PRAGMA foreign_keys = ON')
+            self.connection.execute(f'PRAGMA synchronous = {"OFF" if config.fsync_policy == "never" else "FULL"}')
+            self.connection.executescript(self.schema)
+            self.index_addresses()
+            self.index_domains()
+        except sqlite3.Error as e:
+            raise Exception(f'SQLiteStorage - Error while opening the database "{path}": {e}')
+
+    def index_addresses(self) -> None:
+        """Fill the "address_words" table of a database created before it existed."""
+        if self.connection.execute('SELECT 1 FROM address_words LIMIT 1').fetchone():
+            return
+        with self.connection:
+            rows = self.connection.execute('SELECT id, address FROM contacts WHERE address IS NOT NULL').fetchall()
+            for contact_id, address in rows:
+                self.insert_words(contact_id, address)
+
+    def index_domains(self) -> None:
+        """Fill the "domain_counts" table of a database created before it existed."""
+        if self.connection.execute('SELECT 1 FROM domain_counts LIMIT 1').fetchone():
+            return
+        with self.connection:
+            self.connection.execute(
+                'INSERT INTO domain_counts (domain, contacts) '
+                'SELECT email_domain(value), COUNT(DISTINCT contact_id) FROM emails GROUP BY email_domain(value)'
+            )
+
+    def contact_domains(self, contact_id: int) -> set:
+        """Return the email domains of a contact."""
+        return {domain for domain, in self.connection.execute('SELECT email_domain(value) FROM emails WHERE contact_id = ?', (contact_id,))}
+
+    def count_domains(self, domains, change: int) -> None:
+        """Add `change` to the number of contacts of each of the email domains."""
+        self.connection.executemany(
+            'INSERT INTO domain_counts (domain, contacts) VALUES (?, ?) '
+            'ON CONFLICT(domain) DO UPDATE SET contacts = contacts + excluded.contacts',
+            ((domain, change) for domain in domains),
+        )
+        if change < 0:
+            self.connection.executemany('DELETE FROM domain_counts WHERE domain = ? AND contacts <= 0', ((domain,) for domain in domains))
+
+    def insert_words(self, contact_id: int, address: str) -> None:
+        """Insert the rows of the words of a contact's address."""
+        self.connection.executemany(
+            'INSERT INTO address_words (contact_id, word) VALUES (?, ?)',
+            ((contact_id, word) for word in set(words(address))),
+        )
+
+    # Returns the number of stored contacts
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM contacts').fetchone()[0]
+
+    # Streams all contacts in insertion order
+    def __iter__(self):
+        cursor = self.connection.execute('SELECT id, name, birthday, address FROM contacts ORDER BY id')
+        for row in cursor:
+            yield self.load_record(row)
+
+    def load_record(self, row: tuple) -> Record:
+        """Build a contact from its "contacts" row and its multi-value rows."""
+        contact_id, name, birthday, address = row
+        record = Record(name)
+        if birthday:
+            record.add_value(Birthday, birthday)
+        if address:
+            record.add_value(Address, address)
+        for obj_type, table in self.value_tables.items():
+            values = self.connection.execute(f'SELECT value FROM {table} WHERE contact_id = ? ORDER BY rowid', (contact_id,))
+            for value, in values:
+                record.add_value(obj_type, value)
+        return record
+
+    def names(self):
+        """Stream the names of all contacts."""
+        for name, in self.connection.execute('SELECT name FROM contacts ORDER BY id'):
+            yield name
+
+    def find(self, name: str) -> Record:
+        """Return the contact with the given name or None."""
+        row = self.connection.execute('SELECT id, name, birthday, address FROM contacts WHERE name = ?', (name,)).fetchone()
+        return self.load_record(row) if row else None
+
+    def search(self, prefix: str, offset: int, limit: int) -> list:
+        """Return a page of the contacts whose casefolded names start with the casefolded `prefix`."""
+        prefix = prefix.casefold()
+        rows = self.connection.execute(
+            'SELECT id, name, birthday, address FROM contacts '
+            'WHERE casefold(name) >= ? AND casefold(name) < ? ORDER BY casefold(name), id LIMIT ? OFFSET ?',
+            (prefix, prefix + '\U0010ffff', limit, offset),
+        ).fetchall()
+        return [self.load_record(row) for row in rows]
+
+    def find_by(self, obj_type: type, value: str) -> list:
+        """Return the contacts holding a normalized phone number, email address or group."""
+        rows = self.connection.execute(
+            'SELECT DISTINCT contacts.id, name, birthday, address FROM contacts '
+            f'JOIN {self.value_tables[obj_type]} AS field ON field.contact_id = contacts.id '
+            'WHERE field.value = ? ORDER BY contacts.id',
+            (value,),
+        ).fetchall()
+        return [self.load_record(row) for row in rows]
+
+    def find_by_phone_suffix(self, digits: str) -> list:
+        """Return the contacts with a phone number ending with `digits`."""
+        prefix = digits[::-1]
+        rows = self.connection.execute(
+            'SELECT DISTINCT contacts.id, name, birthday, address FROM contacts '
+            'JOIN phones ON phones.contact_id = contacts.id '
+            'WHERE reverse(phones.value) >= ? AND reverse(phones.value) < ? ORDER BY contacts.id',
+            (prefix, prefix + ':'),
+        ).fetchall()
+        return [self.load_record(row) for row in rows]
+
+    def find_by_domain(self, domain: str) -> list:
+        """Return the contacts with an email address at `domain`."""
+        rows = self.connection.execute(
+            'SELECT id, name, birthday, address FROM contacts WHERE id IN ('
+            'SELECT contact_id FROM emails WHERE email_domain(value) = ?) ORDER BY id',
+            (domain,),
+        ).fetchall()
+        return [self.load_record(row) for row in rows]
+
+    def top_domains(self, count: int) -> list:
+        """Return (domain, number of contacts) pairs of the `count` email domains with the most contacts."""
+        return self.connection.execute('SELECT domain, contacts FROM domain_counts ORDER BY contacts DESC, domain LIMIT ?', (count,)).fetchall()
+
+    def find_by_address(self, query: str) -> list:
+        """Return the contacts whose address contains every word of the query."""
+        query_words = sorted(set(words(query)))
+        if not query_words:
+            return list()
+        rows = self.connection.execute(
+            'SELECT id, name, birthday, address FROM contacts WHERE id IN ('
+            'SELECT contact_id FROM address_words '
+            f'WHERE word IN ({", ".join("?" * len(query_words))}) '
+            'GROUP BY contact_id HAVING COUNT(*) = ?) ORDER BY id',
+            (*query_words, len(query_words)),
+        ).fetchall()
+        return [self.load_record(row) for row in rows]
+
+    def find_birthdays(self, window) -> list:
+        """Return (date, contact) pairs for a window of (date, [(month, day), ...]) calendar days."""
+        result = list()
+        for date, keys in window:
+            days = [f'{day:02}.{month:02}' for month, day in keys]
+            rows = self.connection.execute(
+                'SELECT id, name, birthday, address FROM contacts '
+                f'WHERE substr(birthday, 1, 5) IN ({", ".join("?" * len(days))}) ORDER BY id',
+                days,
+            )
+            result.extend((date, self.load_record(row)) for row in rows.fetchall())
+        return result
+
+    def insert(self, record: Record) -> None:
+        """Insert a new contact with all of its values."""
+        with self.connection:
+            self.insert_record(record)
+
+    def insert_record(self, record: Record) -> None:
+        """Insert the rows of a new contact in the current transaction."""
+        cursor = self.connection.execute(
+            'INSERT INTO contacts (name, birthday, address) VALUES (?, ?, ?)',
+            (record.name.value, self.scalar(record.birthday), self.scalar(record.address)),
+        )
+        for obj_type in self.value_tables:
+            self.insert_values(cursor.lastrowid, record, obj_type)
+        self.count_domains(self.contact_domains(cursor.lastrowid), 1)
+        if record.address:
+            self.insert_words(cursor.lastrowid, record.address.value)
+
+    @property
+    def imported(self) -> bool:
+        """Whether the pickle snapshot has been imported, recorded in the "user_version" pragma."""
+        return self.connection.execute('PRAGMA user_version').fetchone()[0] >= 1
+
+    def import_records(self, records) -> None:
+        """Insert the contacts of the pickle snapshot in one transaction and record the import."""
+        with self.connection:
+            for record in records:
+                self.insert_record(record)
+            self.connection.execute('PRAGMA user_version = 1')
+
+    def delete(self, name: str) -> None:
+        """Delete the contact with the given name together with its values."""
+        with self.connection:
+            row = self.connection.execute('SELECT id FROM contacts WHERE name = ?', (name,)).fetchone()
+            if row:
+                self.count_domains(self.contact_domains(row[0]), -1)
+            self.connection.execute('DELETE FROM contacts WHERE name = ?', (name,))
+
+    def update(self, record: Record, old_name: str, obj_type: type) -> None:
+        """Write back the `obj_type` values of a changed contact stored under `old_name`."""
+        with self.connection:
+            row = self.connection.execute('SELECT id FROM contacts WHERE name = ?', (old_name,)).fetchone()
+            if not row:
+                raise ValueError(f'SQLiteStorage - Contact "{old_name}" not found in the database.')
+            contact_id = row[0]
+
+            if obj_type in self.value_columns:
+                column = self.value_columns[obj_type]
+                value = getattr(record, column)
+                self.connection.execute(f'UPDATE contacts SET {column} = ? WHERE id = ?', (self.scalar(value), contact_id))
+
+            if obj_type == Address:
+                self.connection.execute('DELETE FROM address_words WHERE contact_id = ?', (contact_id,))
+                if record.address:
+                    self.insert_words(contact_id, record.address.value)
+
+            if obj_type in self.value_tables:
+                old_domains = self.contact_domains(contact_id) if obj_type == Email else set()
+                self.connection.execute(f'DELETE FROM {self.value_tables[obj_type]} WHERE contact_id = ?', (contact_id,))
+                self.insert_values(contact_id, record, obj_type)
+                if obj_type == Email:
+                    new_domains = self.contact_domains(contact_id)
+                    self.count_domains(old_domains - new_domains, -1)
+                    self.count_domains(new_domains - old_domains, 1)
+
+    def insert_values(self, contact_id: int, record: Record, obj_type: type) -> None:
+        """Insert the rows of one multi-value field of a contact."""
+        values = getattr(record, obj_type.__name__.lower()) or []
+        self.connection.executemany(
+            f'INSERT INTO {self.value_tables[obj_type]} (contact_id, value) VALUES (?, ?)',
+            ((contact_id, value.value) for value in values),
+        )
+
+    @staticmethod
+    def scalar(value) -> str:
+        """Column value of a single-value field, birthdays are stored as "DD.MM.YYYY"."""
+        return str(value) if value else None
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
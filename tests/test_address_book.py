@@ -0,0 +1,236 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import config
+from address_book import AddressBook, SQLiteAddressBook
+from classes import Record, Name, Birthday, Phone, Email, Address
+
+"""
+Tests of the address book storage modes.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+class StorageTestCase(unittest.TestCase):
+    """Runs every test with the address book stored in a temporary directory."""
+
+    settings = {'storage_mode': 'journal', 'flush_policy': 'immediate', 'fsync_policy': 'never'}
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = dict(
+            self.settings,
+            storage_path=os.path.join(directory.name, 'address_book.pkl'),
+            sqlite_path=os.path.join(directory.name, 'address_book.db'),
+        )
+        for name, value in settings.items():
+            patcher = mock.patch.object(config, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def open_book(self, names: tuple = ()) -> AddressBook:
+        """Open the address book, adding the named contacts."""
+        book = AddressBook()
+        self.addCleanup(book.flusher_stop.set)
+        for name in names:
+            book.add_contact(Record(name))
+        return book
+
+    def rename(self, book: AddressBook, old_name: str, new_name: str) -> None:
+        book.change_contact('change', Record(old_name), Name, new_value=new_name)
+
+
+class TestSnapshot(StorageTestCase):
+
+    settings = dict(StorageTestCase.settings, storage_mode='snapshot')
+
+    def test_legacy_snapshot(self):
+        shutil.copy(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'address_book.pkl'), config.storage_path)
+        book = self.open_book()
+        self.assertGreater(len(book), 0)
+        self.assertEqual(list(book.names), [contact.name.value for contact in book])
+
+    def test_changes_are_not_copied(self):
+        with mock.patch.object(config, 'flush_policy', 'exit'):
+            book = self.open_book(('Anna',))
+            self.assertIs(book.pending[0][0], book.names['Anna'])
+            book.flush()
+
+    def open_saved(self) -> AddressBook:
+        """Save a contact and reopen the book, so the contact is not read yet."""
+        book = self.open_book(('Anna', 'Bob'))
+        book.change_contact('add', Record('Bob'), Phone, '0501234567')
+        book.change_contact('add', Record('Bob'), Birthday, '01.02.1990')
+        book.change_contact('add', Record('Bob'), Address, 'Main street 1')
+        book = self.open_book()
+        self.assertTrue(hasattr(book.names['Bob'], 'source'))
+        return book
+
+    def test_rename_unread_contact(self):
+        book = self.open_saved()
+        self.rename(book, 'Bob', 'Robert')
+        self.assertEqual(book.names['Robert'].name.value, 'Robert')
+
+        book = self.open_book()
+        self.assertEqual([contact.name.value for contact in book], ['Anna', 'Robert'])
+        self.assertEqual(book.find_contact(Record('Robert')).phone[0].value, '+380501234567')
+
+    def test_change_birthday_of_unread_contact(self):
+        book = self.open_saved()
+        book.change_contact('change', Record('Bob'), Birthday, '03.04.1991')
+
+        contact = self.open_book().find_contact(Record('Bob'))
+        self.assertEqual(str(contact.birthday), '03.04.1991')
+        self.assertEqual(contact.phone[0].value, '+380501234567')
+
+    def test_change_address_of_unread_contact(self):
+        book = self.open_saved()
+        book.change_contact('change', Record('Bob'), Address, 'Park avenue 2')
+
+        contact = self.open_book().find_contact(Record('Bob'))
+        self.assertEqual(contact.address.value, 'Park avenue 2')
+        self.assertEqual(contact.phone[0].value, '+380501234567')
+
+
+class TestJournal(StorageTestCase):
+
+    def make_changes(self) -> AddressBook:
+        book = self.open_book(('Anna', 'Bob', 'Carl'))
+        self.rename(book, 'Bob', 'Boris')
+        book.delete_contact(Record('Anna'))
+        book.add_contact(Record('Dana'))
+        book.change_contact('add', Record('Carl'), Phone, '0501234567')
+        return book
+
+    def names(self, book: AddressBook) -> list:
+        return [contact.name.value for contact in book]
+
+    def test_replay(self):
+        self.make_changes()
+        self.assertFalse(os.path.exists(config.storage_path))
+        self.assertGreater(os.path.getsize(config.storage_path + '.journal'), 0)
+
+        book = self.open_book()
+        self.assertEqual(self.names(book), ['Boris', 'Carl', 'Dana'])
+        self.assertEqual(sorted(book.names), ['Boris', 'Carl', 'Dana'])
+        self.assertEqual(book.find_contact(Record('Carl')).phone[0].value, '+380501234567')
+
+    def test_order(self):
+        book = self.make_changes()
+        self.assertEqual(self.names(book), ['Boris', 'Carl', 'Dana'])
+        self.assertEqual(len(book), 3)
+        self.assertEqual(list(book.names), ['Carl', 'Boris', 'Dana'])
+
+    def test_replay_recreated_name(self):
+        book = self.open_book(('Anna', 'Bob'))
+        book.delete_contact(Record('Anna'))
+        book.add_contact(Record('Anna'))
+        self.rename(book, 'Bob', 'Anna2')
+        self.rename(book, 'Anna2', 'Bob')
+
+        self.assertEqual(self.names(self.open_book()), ['Bob', 'Anna'])
+
+    def test_compaction(self):
+        with mock.patch.object(config, 'journal_compact_size', 0):
+            self.make_changes()
+        self.assertFalse(os.path.exists(config.storage_path + '.journal'))
+        self.assertEqual(self.names(self.open_book()), ['Boris', 'Carl', 'Dana'])
+
+    def test_snapshot_mode_folds_journal(self):
+        self.make_changes()
+        with mock.patch.object(config, 'storage_mode', 'snapshot'):
+            book = self.open_book()
+        self.assertEqual(self.names(book), ['Boris', 'Carl', 'Dana'])
+        self.assertFalse(os.path.exists(config.storage_path + '.journal'))
+        self.assertEqual(self.names(self.open_book()), ['Boris', 'Carl', 'Dana'])
+
+
+class TestDeferredFlush(StorageTestCase):
+
+    settings = dict(StorageTestCase.settings, flush_policy='exit')
+
+    def test_rename_cycle(self):
+        book = self.open_book(('Max', 'Jane', 'Oleg'))
+        book.change_contact('add', Record('Max'), Phone, '0501234567')
+        self.rename(book, 'Max', 'Tmp')
+        self.rename(book, 'Jane', 'Max')
+        self.rename(book, 'Tmp', 'Jane')
+        book.flush()
+
+        book = self.open_book()
+        self.assertEqual([contact.name.value for contact in book], ['Jane', 'Max', 'Oleg'])
+        self.assertEqual(book.find_contact(Record('Jane')).phone[0].value, '+380501234567')
+        self.assertIsNone(book.find_contact(Record('Max')).phone)
+
+    def test_interval_switched_to_exit(self):
+        with mock.patch.object(config, 'flush_policy', 'interval'), mock.patch.object(config, 'flush_interval', 10):
+            book = self.open_book()
+            book.add_contact(Record('Anna'))
+            time.sleep(0.1)
+            self.assertFalse(book.dirty)
+
+            config.flush_policy = 'exit'
+            book.add_contact(Record('Bob'))
+            time.sleep(0.1)
+            self.assertTrue(book.dirty)
+            book.flush()
+        self.assertEqual([contact.name.value for contact in self.open_book()], ['Anna', 'Bob'])
+
+
+class TestSQLite(StorageTestCase):
+
+    settings = dict(StorageTestCase.settings, storage_mode='snapshot')
+
+    def open_database(self) -> SQLiteAddressBook:
+        book = SQLiteAddressBook()
+        self.addCleanup(book.storage.close)
+        return book
+
+    def test_import_once(self):
+        self.open_book(('Anna', 'Bob'))
+        book = self.open_database()
+        self.assertEqual(list(book.storage.names()), ['Anna', 'Bob'])
+        book.delete_contact(Record('Anna'))
+        book.delete_contact(Record('Bob'))
+
+        self.assertEqual(len(self.open_database()), 0)
+
+    def test_database_without_import_record(self):
+        self.open_book(('Anna', 'Bob'))
+        book = self.open_database()
+        book.delete_contact(Record('Anna'))
+        book.storage.connection.execute('PRAGMA user_version = 0')
+
+        self.assertEqual(list(self.open_database().storage.names()), ['Bob'])
+
+    def test_domain_counts(self):
+        book = self.open_database()
+        for name, emails in (('Anna', ('anna@mail.com', 'a@mail.com')), ('Bob', ('bob@ukr.net',)), ('Carl', ('carl@mail.com',))):
+            book.add_contact(Record(name))
+            for email in emails:
+                book.change_contact('add', Record(name), Email, email)
+        self.assertEqual(book.top_domains(), [('mail.com', 2), ('ukr.net', 1)])
+
+        book.change_contact('change', Record('Anna'), Email, 'anna@ukr.net', 'anna@mail.com')
+        self.assertEqual(book.top_domains(), [('mail.com', 2), ('ukr.net', 2)])
+        book.change_contact('delete', Record('Anna'), Email, 'a@mail.com')
+        self.assertEqual(book.top_domains(), [('ukr.net', 2), ('mail.com', 1)])
+        self.rename(book, 'Carl', 'Dana')
+        book.delete_contact(Record('Bob'))
+        self.assertEqual(book.top_domains(1), [('mail.com', 1)])
+        book.delete_contact(Record('Dana'))
+        self.assertEqual(book.top_domains(), [('ukr.net', 1)])
+
+        # A database created before the counts were kept is counted when it is opened.
+        book.storage.connection.execute('DELETE FROM domain_counts')
+        book.storage.connection.commit()
+        self.assertEqual(self.open_database().top_domains(), [('ukr.net', 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
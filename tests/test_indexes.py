@@ -0,0 +1,116 @@
+import datetime
+import random
+import unittest
+from classes import Record
+from indexes import NameTrigrams, edit_distance, calendar_window
+
+"""
+Tests of the in-memory indexes.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+def levenshtein(first: str, second: str) -> int:
+    """Reference edit distance computed with the full dynamic programming table."""
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1, previous[column - 1] + (first_char != second_char)))
+        previous = current
+    return previous[-1]
+
+
+class TestNameTrigrams(unittest.TestCase):
+
+    def setUp(self) -> None:
+        generator = random.Random(0)
+        self.names = ['Max', 'Jane', 'Jana', 'June', 'Oleg', 'Al', 'Bo', 'Maxim', 'Olena Koval']
+        self.names += [''.join(generator.choice('abcdejmnox') for _ in range(generator.randint(2, 12))) for _ in range(400)]
+        contacts = {contact.name.value: contact for contact in map(Record, self.names)}
+        self.names = list(contacts)
+        self.index = NameTrigrams()
+        for contact in contacts.values():
+            self.index.add(contact)
+
+        self.queries = ['Mx', 'Jne', 'M', 'Ma', 'Olg', 'Jnae', 'Olena Kovl', 'maxi', '']
+        self.queries += [''.join(generator.choice('abcdejmnox ') for _ in range(generator.randint(1, 12))) for _ in range(100)]
+
+    def brute_force(self, query: str, max_distance: int) -> list:
+        query = query.casefold()
+        matches = ((levenshtein(query, name.casefold()), name) for name in self.names)
+        return sorted(match for match in matches if match[0] <= max_distance)
+
+    def test_find_all(self):
+        for max_distance in (1, 2, 3):
+            for query in self.queries:
+                found = sorted((distance, contact.name.value) for distance, contact in self.index.find(query, len(self.names), max_distance))
+                self.assertEqual(found, self.brute_force(query, max_distance), (query, max_distance))
+
+    def test_find_closest(self):
+        for query in self.queries:
+            found = [distance for distance, _ in self.index.find(query, 3, 2)]
+            self.assertEqual(found, [distance for distance, _ in self.brute_force(query, 2)[:3]], query)
+
+    def test_short_queries(self):
+        self.assertEqual([(distance, contact.name.value) for distance, contact in self.index.find('Mx', 3, 2)][:1], [(1, 'Max')])
+        self.assertEqual([distance for distance, _ in self.index.find('Jne', 3, 2)], [1, 1, 1])
+
+    def test_remove(self):
+        self.index.find('Mx', 3, 2)
+        self.index.remove(Record('Max'))
+        self.assertNotIn('Max', [contact.name.value for _, contact in self.index.find('Mx', 10, 2)])
+        self.index.add(Record('Max'))
+        self.assertIn('Max', [contact.name.value for _, contact in self.index.find('Mx', 10, 2)])
+
+    def test_edit_distance(self):
+        for query in self.queries:
+            for name in self.names[:50]:
+                self.assertEqual(edit_distance(query, name), levenshtein(query, name), (query, name))
+
+
+class TestCalendarWindow(unittest.TestCase):
+
+    def celebrations(self, start: datetime.date, days: int) -> dict:
+        """Return the dates of every (month, day) birthday celebrated in the window."""
+        result = dict()
+        for date, keys in calendar_window(start, days):
+            for key in keys:
+                result.setdefault(key, list()).append(date)
+        return result
+
+    def test_whole_year(self):
+        for start in (datetime.date(2028, 2, 29), datetime.date(2028, 2, 28), datetime.date(2027, 2, 28),
+                      datetime.date(2027, 3, 1), datetime.date(2027, 12, 31), datetime.date(2028, 12, 31)):
+            celebrations = self.celebrations(start, 1000)
+            self.assertEqual(len(celebrations), 366, start)
+            self.assertTrue(all(len(dates) == 1 for dates in celebrations.values()), start)
+
+    def test_february_29_from_leap_day(self):
+        celebrations = self.celebrations(datetime.date(2028, 2, 29), 366)
+        self.assertEqual(celebrations[(2, 29)], [datetime.date(2028, 2, 29)])
+        self.assertEqual(celebrations[(2, 28)], [datetime.date(2029, 2, 28)])
+        self.assertEqual(celebrations[(1, 1)], [datetime.date(2029, 1, 1)])
+
+    def test_february_29_across_the_year_boundary(self):
+        celebrations = self.celebrations(datetime.date(2026, 12, 30), 70)
+        self.assertEqual(celebrations[(2, 28)], [datetime.date(2027, 2, 28)])
+        self.assertEqual(celebrations[(2, 29)], [datetime.date(2027, 2, 28)])
+
+        celebrations = self.celebrations(datetime.date(2027, 12, 30), 70)
+        self.assertEqual(celebrations[(2, 28)], [datetime.date(2028, 2, 28)])
+        self.assertEqual(celebrations[(2, 29)], [datetime.date(2028, 2, 29)])
+
+    def test_february_29_at_the_end_of_the_window(self):
+        celebrations = self.celebrations(datetime.date(2027, 3, 1), 366)
+        self.assertEqual(celebrations[(2, 29)], [datetime.date(2028, 2, 29)])
+        self.assertEqual(celebrations[(3, 1)], [datetime.date(2027, 3, 1)])
+
+        celebrations = self.celebrations(datetime.date(2027, 3, 1), 365)
+        self.assertEqual(celebrations[(2, 28)], [datetime.date(2028, 2, 28)])
+        self.assertNotIn((2, 29), celebrations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import config
+from serialize_pickle import Serializer, RecordFile
+from classes import Record, Phone
+
+"""
+Tests of the snapshot file format.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+class TestRecordFile(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'address_book.pkl')
+        patcher = mock.patch.object(config, 'fsync_policy', 'never')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        contacts = [Record(f'Name {index}') for index in range(5)]
+        for index, contact in enumerate(contacts):
+            contact.add_value(Phone, f'050000000{index}')
+        Serializer.serialize_dict(contacts, self.path)
+
+    def test_lazy_records(self):
+        contacts = Serializer.deserialize_dict(self.path)
+        self.assertEqual([contact.name.value for contact in contacts], [f'Name {index}' for index in range(5)])
+        self.assertEqual(contacts[3].phone[0].value, '+380500000003')
+
+    def test_replace_closes_snapshot(self):
+        contacts = Serializer.deserialize_dict(self.path)
+        record_file = contacts[0].source[0]
+        contacts[0].load()
+        self.assertIsNotNone(record_file.file)
+
+        replace = os.replace
+        def strict_replace(source, target):
+            # Renaming an open file fails on Windows.
+            self.assertIsNone(record_file.file)
+            replace(source, target)
+
+        with mock.patch('os.replace', strict_replace):
+            Serializer.serialize_dict(contacts, self.path)
+        self.assertEqual(record_file.path, f'{self.path}.prev')
+        self.assertEqual([contact.phone[0].value for contact in contacts[1:]], [f'+38050000000{index}' for index in range(1, 5)])
+        self.assertEqual(len(Serializer.deserialize_dict(self.path)), 5)
+
+    def test_save_after_recovery_keeps_previous_generation(self):
+        contacts = Serializer.deserialize_dict(self.path)
+        Serializer.serialize_dict(contacts, self.path)
+        with open(self.path, 'wb') as file:
+            file.write(b'corrupt')
+
+        contacts = Serializer.deserialize_dict(self.path)
+        self.assertEqual(len(contacts), 5)
+        contacts.append(Record('Name 5'))
+        Serializer.serialize_dict(contacts, self.path)
+        self.assertEqual(len(Serializer.deserialize_dict(f'{self.path}.prev')), 5)
+
+        with open(self.path, 'r+b') as file:
+            file.truncate(10)
+        self.assertEqual(len(Serializer.deserialize_dict(self.path)), 5)
+
+    def test_table_read_closes_file(self):
+        record_file = RecordFile(self.path)
+        self.assertIsNone(record_file.file)
+        self.assertEqual(len(record_file.offsets), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import datetime
+import unittest
+from classes import Birthday, Phone
+from validation import validation_batch
+
+"""
+Tests of the field validation.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+class TestValidationBatch(unittest.TestCase):
+
+    def test_errors_by_row(self):
+        normalized, errors = validation_batch(Phone, ['0501234567', 'phone', '', '+380501234568'])
+        self.assertEqual(normalized, ['+380501234567', None, None, '+380501234568'])
+        self.assertEqual([row for row, _ in errors], [1, 2])
+
+    def test_birthday_today(self):
+        values = ['01.01.2000', '15.06.2030', '31.02.2000']
+        today = datetime.date(2030, 6, 15)
+        normalized, errors = validation_batch(Birthday, values, today=today)
+        self.assertEqual(normalized, [datetime.date(2000, 1, 1).toordinal(), today.toordinal(), None])
+        self.assertEqual([row for row, _ in errors], [2])
+
+        _, errors = validation_batch(Birthday, values, today=datetime.date(2030, 6, 14))
+        self.assertEqual([row for row, _ in errors], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
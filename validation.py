@@ -1,26 +1,65 @@
 import re
 import datetime
+import functools
 
 # Validation patterns.
 pattern_name = {'min': 2, 'max': 20}
 pattern_phone = r'^(?:\+?380|0|80)\d{9}$'
-pattern_email = r'^([A-Za-z0-9]+[.-_])*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$'
+pattern_email = r'^([A-Za-z0-9]+[.-_])*[A-Za-z0-9]+@[A-Za-z0-9-]+(\.[A-Z|a-z]{2,})+$' # Reference only, backtracks exponentially.
 date_pattern = r'%d.%m.%Y'
 pattern_groups = ['Family', 'Parents', 'Friends', 'Work', 'School']
 pattern_address = {'min': 5, 'max': 20}
 
+# Patterns compiled once at import.
+regex_phone = re.compile(pattern_phone)
+# Email address parts, equivalent to `pattern_email` but free of nested quantifiers so every check is linear.
+# The local part separators are the "[.-_]" range of `pattern_email` (from "." to "_") without letters and digits.
+regex_email_local = re.compile(r'[A-Za-z0-9./:;<=>?@\[\\\]^_]+')
+regex_email_separators = re.compile(r'[^A-Za-z0-9]{2}')
+regex_email_domain = re.compile(r'[A-Za-z0-9-]+')
+regex_email_zones = re.compile(r'(?:\.[A-Z|a-z]{2,})+') # Every repetition starts at a "." that the letters cannot match.
+regex_date = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})')
+groups = frozenset(pattern_groups)
+
+# Validators of the field types: field class -> checker returning (normalized value, error message).
+validators = dict()
+
+def register_validator(obj_type: type, validator) -> None:
+    """
+    Register the validator of a field type.
+
+    Parameters:
+        obj_type (type): The field class, e.g. Phone.
+        validator (callable): Takes the raw value and returns the (normalized value, None) pair,
+            or (None, error message) if the value is invalid (see `check_name`).
+    """
+    validators[obj_type] = validator
+
+def find_validator(obj_type: type):
+    """
+    Return the validator of a field type.
+
+    Field classes without their own validator use the validator of the closest registered base class
+    (the lookup is cached). Classes without any validator keep their values unchanged.
+    """
+    validator = validators.get(obj_type)
+    if validator is None:
+        validator = next((validators[base] for base in obj_type.__mro__ if base in validators), None)
+        validators[obj_type] = validator = validator or (lambda value: (value, None))
+    return validator
+
 def validation(obj: object, value: str) -> str:
     """
     Main validation function.
 
-    Checks the given `value` with respect to the object type `obj`.
+    Checks the given `value` with the validator registered for the type of `obj`.
 
     Parameters:
         obj (object): The object for validation.
         value (str): The value to be validated.
 
     Returns:
-        str: The formatted value after validation.
+        str | int: The formatted value after validation (a day ordinal for birthdays).
 
     Raises:
         ValueError: If the `value` does not pass validation.
@@ -28,20 +67,11 @@ def validation(obj: object, value: str) -> str:
     if not value: # Check if a value is provided for validation.
         raise ValueError(f'Validation - Value {value} cannot be empty.')
 
-    obj_type = obj.__class__.__name__
- 
-    if obj_type == 'Name': # Validate name.
-        value = validation_name(value)
-    elif obj_type == 'Birthday': # Validate birthday date format and check against today's date.
-        value = validation_birthday(value)  
-    elif obj_type == 'Phone': # Validate phone number format for Ukrainian operators.
-        value = validation_phone(value)
-    elif obj_type == 'Email': # Validate email address format.
-        value = validation_email(value) 
-    elif obj_type == 'Group': # Validate group name against the list.
-        value = validation_group(value)
-    elif obj_type == 'Address': # Validate physical address.
-        value = validation_address(value)
+    validator = validators.get(type(obj)) or find_validator(type(obj))
+    value, error = validator(value)
+
+    if error:
+        raise ValueError(error)
 
     return value
 
@@ -60,14 +90,14 @@ def validation_name(value: str) -> str:
     Raises:
         ValueError: If the length of the name is not within the specified range.
     """
-    value = value.strip()
+    value, error = check_name(value)
+
+    if error:
+        raise ValueError(error)
 
-    if len(value) < pattern_name['min'] or len(value) > pattern_name['max']:
-        raise ValueError(f'Validation - Name "{value}" should contain between {pattern_name["min"]} and {pattern_name["max"]} characters.')
-    
     return value
 
-def validation_birthday(value: str) -> str:
+def validation_birthday(value: str) -> int:
     """
     Validate the birthday date.
 
@@ -77,20 +107,17 @@ def validation_birthday(value: str) -> str:
         value (str): The birthday date string to be validated.
 
     Returns:
-        str: The validated birthday date string.
+        int: The day ordinal of the validated birthday date (see datetime.date.toordinal).
 
     Raises:
         ValueError: If the birthday date format is incorrect or if it's in the future.
     """
-    try:
-        value = datetime.datetime.strptime(value, date_pattern).date()
-    except ValueError:
-        raise ValueError(f'Validation - Incorrect birthday date format - "{value}". Please enter in "DD.MM.YYYY" format.')
-    else:   
-        if  value > datetime.datetime.today().date():
-            raise ValueError(f'Validation - Birthday date "{value}" cannot be in the future.')
-        
-    return value.strftime(date_pattern)
+    value, error = check_birthday(value)
+
+    if error:
+        raise ValueError(error)
+
+    return value
 
 def validation_phone(value: str) -> str:
     """
@@ -107,18 +134,19 @@ def validation_phone(value: str) -> str:
     Raises:
         ValueError: If the phone number format is incorrect.
     """
-    match = re.fullmatch(pattern_phone, value)
+    value, error = check_phone(value)
+
+    if error:
+        raise ValueError(error)
 
-    if not match: 
-        raise ValueError(f'Validation - Incorrect phone number format - "{value}".')
-    
-    return f'+38{match.group()[-10:]}'
+    return value
 
 def validation_email(value: str) -> str:
     """
     Validate the email address.
 
-    Checks if the email address matches the standard format.
+    Checks if the email address matches the standard format (`pattern_email`). The address is
+    checked part by part with single character class patterns, so the time is linear in its length.
 
     Parameters:
         value (str): The email address string to be validated.
@@ -129,12 +157,12 @@ def validation_email(value: str) -> str:
     Raises:
         ValueError: If the email address format is incorrect.
     """
-    match = re.fullmatch(pattern_email, value) 
+    value, error = check_email(value)
+
+    if error:
+        raise ValueError(error)
 
-    if not match: 
-        raise ValueError(f'Validation - Incorrect email address format - "{value}".')
-    
-    return f'{match.group().casefold()}'
+    return value
 
 def validation_group(value:str) -> str:
     """
@@ -151,11 +179,11 @@ def validation_group(value:str) -> str:
     Raises:
         ValueError: If the group name does not exist in the predefined list.
     """
-    value = value.capitalize()
+    value, error = check_group(value)
+
+    if error:
+        raise ValueError(error)
 
-    if value not in pattern_groups:
-        raise ValueError(f'Validation - Group "{value}" does not exist.')
-    
     return value
 
 def validation_address(value:str) -> str:
@@ -173,9 +201,120 @@ def validation_address(value:str) -> str:
     Raises:
         ValueError: If the length of the address string is not within the specified range.
     """
+    value, error = check_address(value)
+
+    if error:
+        raise ValueError(error)
+
+    return value
+
+# Checkers return (normalized value, None) for a valid value and (None, error message) otherwise,
+# so that a whole column can be validated without raising an exception per invalid value.
+
+def check_name(value: str) -> tuple:
+    """Check the name value, see `validation_name`."""
+    value = value.strip()
+
+    if len(value) < pattern_name['min'] or len(value) > pattern_name['max']:
+        return None, f'Validation - Name "{value}" should contain between {pattern_name["min"]} and {pattern_name["max"]} characters.'
+
+    return value, None
+
+def check_birthday(value: str, today: datetime.date = None) -> tuple:
+    """Check the birthday date, see `validation_birthday`."""
+    match = regex_date.fullmatch(value)
+    if not match:
+        return None, f'Validation - Incorrect birthday date format - "{value}". Please enter in "DD.MM.YYYY" format.'
+
+    day, month, year = match.groups()
+    try:
+        value = datetime.date(int(year), int(month), int(day))
+    except ValueError:
+        return None, f'Validation - Incorrect birthday date format - "{value}". Please enter in "DD.MM.YYYY" format.'
+
+    if value > (today or datetime.date.today()):
+        return None, f'Validation - Birthday date "{value}" cannot be in the future.'
+
+    return value.toordinal(), None
+
+def check_phone(value: str) -> tuple:
+    """Check the phone number, see `validation_phone`."""
+    match = regex_phone.fullmatch(value)
+
+    if not match:
+        return None, f'Validation - Incorrect phone number format - "{value}".'
+
+    return f'+38{match.group()[-10:]}', None
+
+def check_email(value: str) -> tuple:
+    """Check the email address, see `validation_email`."""
+    # The domain cannot contain "@", so the address is split at the last one.
+    local, at, domain = value.rpartition('@')
+    host, dot, zones = domain.partition('.')
+
+    valid = (
+        at
+        and regex_email_local.fullmatch(local)
+        and local[0].isalnum()
+        and local[-1].isalnum()
+        and not regex_email_separators.search(local)
+        and regex_email_domain.fullmatch(host)
+        and regex_email_zones.fullmatch(domain, len(host))
+    )
+
+    if not valid:
+        return None, f'Validation - Incorrect email address format - "{value}".'
+
+    return value.casefold(), None
+
+def check_group(value: str) -> tuple:
+    """Check the group name, see `validation_group`."""
+    value = value.capitalize()
+
+    if value not in groups:
+        return None, f'Validation - Group "{value}" does not exist.'
+
+    return value, None
+
+def check_address(value: str) -> tuple:
+    """Check the physical address, see `validation_address`."""
     value = value.strip()
 
-    if len(value) < pattern_address['min'] or len(value) > pattern_address['max']: 
-        raise ValueError(f'Validation - Address "{value}" should contain between {pattern_address["min"]} and {pattern_address["max"]} characters.')
-    
-    return value
\ No newline at end of file
+    if len(value) < pattern_address['min'] or len(value) > pattern_address['max']:
+        return None, f'Validation - Address "{value}" should contain between {pattern_address["min"]} and {pattern_address["max"]} characters.'
+
+    return value, None
+
+def validation_batch(obj_type: type, values: list, today: datetime.date = None) -> tuple:
+    """
+    Validate a column of values of one field type in one pass.
+
+    Uses the checker registered for `obj_type` and collects every error instead of
+    stopping at the first one.
+
+    Parameters:
+        obj_type (type): The field class of the column, e.g. Phone.
+        values (list): The raw values of the column.
+        today (datetime.date): The date birthdays must not be later than, today by default.
+            Only used for the birthday column.
+
+    Returns:
+        tuple: The list of normalized values (None in the rows that did not pass validation)
+        and the list of (row, error message) pairs, rows are counted from 0.
+    """
+    checker = find_validator(obj_type)
+    if checker is check_birthday:
+        checker = functools.partial(check_birthday, today=today)
+    normalized = list()
+    errors = list()
+
+    for row, value in enumerate(values):
+        if not value:
+            value, error = None, f'Validation - Value {value} cannot be empty.'
+        else:
+            value, error = checker(value)
+        if error:
+            errors.append((row, error))
+        normalized.append(value)
+
+    return normalized, errors